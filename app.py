@@ -1,7 +1,20 @@
 import streamlit as st
 import os
-from standards_database import get_standards_data, get_states, get_content_areas, get_grades, get_standards, get_sub_standards
-from project_generator import generate_comprehensive_project
+import threading
+import time
+from contextlib import contextmanager
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from standards_index import get_standards_index
+from standards_search import search_standards
+from project_generator import (SECTION_LESSON_PLAN, SECTION_MODIFICATION, SECTION_STANDARD_PROJECT, get_model_client,
+                               model_unavailable_error, section_label)
+from deadline import GENERATION_DEADLINE_SECONDS, Deadline
+from generation_jobs import ACTIVE_STATUSES, JOB_CANCELLED, JOB_QUEUED, get_job_manager
+from project_config import GroupSize, LearningEnvironment, TimeAllotment, normalize_project_config
+from token_budget import TokenBudgetError
+from tracing import format_waterfall, get_metrics, start_exporters
+from profiling import profiled, sample_session
 from accessibility_modifications import get_accessibility_options, get_accessibility_descriptions
 
 # Page configuration
@@ -11,6 +24,18 @@ st.set_page_config(
     layout="wide"
 )
 
+# Appending ?admin=<ADMIN_TOKEN> to the URL shows the latency waterfall; hidden when ADMIN_TOKEN is unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def profile_requested():
+    """Profile this session's reruns and generations: sampled once per session, or ?profile=<ADMIN_TOKEN>"""
+    if "profile_session" not in st.session_state:
+        st.session_state.profile_session = sample_session()
+    return st.session_state.profile_session or (bool(ADMIN_TOKEN) and st.query_params.get("profile") == ADMIN_TOKEN)
+
+# Covers the whole rerun, including the CSS below; finished after main() at the bottom of the script
+rerun_profile = profiled("rerun", profile_requested()).start()
+
 # Custom CSS for modern, school-friendly design
 st.markdown("""
 <style>
@@ -117,98 +142,382 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'standards_data' not in st.session_state:
-    st.session_state.standards_data = get_standards_data()
+@st.cache_resource
+def warm_up_model_client():
+    """Open pooled OpenRouter connections once per server process, without blocking the page"""
+    client = get_model_client()
+    threading.Thread(target=client.warm_up, kwargs={"connections": 4}, daemon=True).start()
+    return client
 
-def main():
-    # Modern header
-    st.markdown("""
-    <div class="header-container">
-        <h1 class="header-title">🍑 Georgia Middle School Project Generator</h1>
-        <p class="header-subtitle">Create comprehensive, standards-aligned educational projects with built-in accessibility support</p>
-    </div>
-    """, unsafe_allow_html=True)
+warm_up_model_client()
+
+@st.cache_resource
+def start_metrics_exporters():
+    """Start the Prometheus endpoint / JSONL exporter (METRICS_PORT, METRICS_JSONL_PATH) once per server process"""
+    return start_exporters()
+
+start_metrics_exporters()
+
+# How often a running generation job's progress is redrawn
+JOB_POLL_SECONDS = 0.5
+# Long sections are shown a page of ### subsections at a time, about this many characters each
+RESULT_PAGE_CHARS = int(os.getenv("RESULT_PAGE_CHARS", "4000"))
+
+# Shared, read-only standards index (built once per server process, not per session)
+standards_index = get_standards_index()
+
+# Standards come from Georgia only for now
+SELECTED_STATE = "Georgia"
+
+@contextmanager
+def timed(name):
+    """Record how long the enclosed page run, fragment run or render takes as the `name` timing"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        get_metrics().record_timing(name, time.monotonic() - started)
+
+def current_session_id():
+    """ID of the browser session running this script, or None outside a Streamlit server"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+def session_alive(session_id):
+    """False once a browser session has disconnected (closed tab, lost connection)"""
+    return not Runtime.exists() or Runtime.instance().is_active_session(session_id)
+
+def release_abandoned_job(selected_sub_standard):
+    """Cancel this session's running job once the teacher has moved on to a different standard"""
+    job_id = st.session_state.get("generation_job_id")
+    job = get_job_manager().get(job_id) if job_id else None
+    if job is not None and job.status in ACTIVE_STATUSES and job.config.sub_standard != selected_sub_standard:
+        get_job_manager().release(current_session_id())
+
+def apply_search_selection(results_by_code):
+    """Fill the standards cascade from the sub-standard picked in the search results"""
+    result = results_by_code.get(st.session_state.search_result_select)
+    if result:
+        st.session_state.content_area_select = result.content_area
+        st.session_state.grade_select = result.grade
+        st.session_state.standard_select = result.standard
+        st.session_state.sub_standard_select = result.sub_standard
+    st.session_state.search_result_select = ""
+
+def is_admin():
+    """True when the page was opened with the admin token"""
+    return bool(ADMIN_TOKEN) and st.query_params.get("admin") == ADMIN_TOKEN
+
+def render_latency_waterfall(job):
+    """Admin-only view of where the job's time went, plus the process-wide aggregates"""
+    with st.expander("🛠️ Latency waterfall (admin)"):
+        trace = job.trace.to_dict()
+        st.code(format_waterfall(trace), language=None)
+        st.json(get_metrics().snapshot(), expanded=False)
+
+@st.cache_resource(max_entries=256)
+def saved_results_summary(job_id):
+    """
+    How many of a finished job's sections came from the section cache and how many were
+    generated, counted from the job's own section spans once rather than on every rerun
+    """
+    job = get_job_manager().get(job_id)
+    sections = [span for span in job.trace.spans() if span["name"] == "section"] if job else []
+    reused = sum(1 for span in sections if span["attrs"].get("cache") == "hit")
+    generated = sum(1 for span in sections if span["attrs"].get("cache") == "miss")
+    return f"📦 Saved results: {reused} section{'s' if reused != 1 else ''} reused · {generated} generated"
+
+def render_generation_job(job, snapshot):
+    """
+    Show a job's status and the section the teacher picked. Modification sections are listed in
+    the order the teacher selected them in, while the job's sections are in canonical order.
+    """
+    with timed("render"):
+        draw_generation_job(job, snapshot)
+    if is_admin():
+        render_latency_waterfall(job)
+
+def draw_generation_job(job, snapshot):
+    """Draw the status message, warnings, section picker and chosen section of render_generation_job"""
+    config = job.config
+    running = snapshot["status"] in ACTIVE_STATUSES
+    document = snapshot["document"]
+    errors = snapshot["errors"]
     
-    # Initialize all variables with defaults to avoid UnboundLocalError
-    selected_state = "Georgia"  # Fixed to Georgia
-    selected_content_area = ""
-    selected_grade = ""
-    selected_standard = ""
-    selected_sub_standard = ""
-    standard_info = {}
-    sub_standards = {}
-    selected_group_size = ""
-    selected_environment = ""
-    selected_time = ""
-    selected_modifications = []
+    if snapshot["status"] == JOB_QUEUED:
+        st.info("⏳ Waiting for a free generator... You can keep editing the form while you wait; "
+                "choosing a different standard cancels this package.")
+    elif running:
+        st.info(f"⏳ Generating comprehensive project package ({snapshot['elapsed_seconds']:.0f} s)... "
+                "Sections appear below as they are written. You can keep editing the form while you wait; "
+                "choosing a different standard cancels this package.")
+    elif snapshot["status"] == JOB_CANCELLED:
+        st.warning(f"⏹️ Generation stopped because {snapshot['cancel_reason']}. "
+                   "Sections that were finished are saved and will be reused.")
+    elif snapshot["failure"]:
+        st.error(snapshot["failure"])
+    elif errors:
+        st.error(f"❌ {len(errors)} of {len(document.expected)} sections could not be generated. Generate again to retry only those sections.")
+    else:
+        st.success("✅ Project package generated successfully!")
+        st.caption(saved_results_summary(job.id))
     
-    # Create two columns for better layout
-    col1, col2 = st.columns([1, 1])
+    for warning in snapshot["warnings"]:
+        st.warning(f"⚠️ {warning}")
+    if snapshot["truncated"]:
+        labels = ", ".join(section_label(*key) for key in snapshot["truncated"])
+        st.warning(f"⚠️ Cut short at the model's output limit and may be incomplete: {labels}. "
+                   "Generate a fresh version to try again.")
     
-    with col1:
+    # Display the generated content
+    st.markdown("## 📋 Generated Project Package")
+    st.caption(f"{config.sub_standard} · {config.grade} {config.content_area} · {config.group_size} · "
+               f"{config.environment} · {config.time_allotment}")
+    
+    # One entry per section. Modification sections are generated in canonical order; list them in the order the teacher picked
+    tab_order = [mod for mod in st.session_state.get("generation_tab_order", ()) if mod in config.accessibility_modifications]
+    tab_order += [mod for mod in config.accessibility_modifications if mod not in tab_order]
+    tab_names = ["Standard Project", "Formal Lesson Plan"] + [f"{mod} Version" for mod in tab_order]
+    headings = ["### 📘 Standard Project", "### 📄 Formal Lesson Plan"] + [f"### ♿ {mod} Version" for mod in tab_order]
+    keys = [(SECTION_STANDARD_PROJECT, None), (SECTION_LESSON_PLAN, None)] + [(SECTION_MODIFICATION, mod) for mod in tab_order]
+    
+    # Only the chosen section is rendered and sent to the browser, not every section in hidden tabs
+    if st.session_state.get("result_section", 0) >= len(tab_names):
+        st.session_state.result_section = 0
+    position = st.radio(
+        "Section",
+        options=list(range(len(tab_names))),
+        format_func=lambda position: ("❌ " if keys[position] in errors else
+                                      "⚠️ " if keys[position] in snapshot["truncated"] else "") + tab_names[position],
+        key="result_section",
+        horizontal=True,
+        label_visibility="collapsed"
+    )
+    key = keys[position]
+    section = document.sections.get(key)
+    st.markdown(headings[position])
+    if key in errors:
+        st.error(errors[key])
+    elif section is not None:
+        render_section_pages("_".join(filter(None, (job.id, *key))), section, running)
+    elif running:
+        st.caption("⏳ Waiting for this section...")
+    else:
+        st.markdown("No content was generated for this section.")
+
+def page_by_heading(section, page_chars=RESULT_PAGE_CHARS):
+    """
+    Group a parsed section into pages of whole subsections of about page_chars each; a longer
+    subsection is a page of its own. Returns (text, subsection titles) per page.
+    """
+    parts = [(None, section.intro)] if section.intro.strip() else []
+    parts += [(subsection.title, subsection.text) for subsection in section.subsections]
+    pages = []
+    for title, text in parts:
+        if pages and len(pages[-1][0]) + len(text) <= page_chars:
+            pages[-1] = (pages[-1][0] + text, pages[-1][1] + [title] if title else pages[-1][1])
+        else:
+            pages.append((text, [title] if title else []))
+    return pages
+
+def show_more_pages(key):
+    st.session_state[key] = st.session_state.get(key, 1) + 1
+
+def render_section_pages(key, section, running):
+    """Show a section's first page; later pages are sent only once the teacher asks for them"""
+    pages = page_by_heading(section)
+    shown_key = f"result_pages_{key}"
+    shown = st.session_state.get(shown_key, 1)
+    st.markdown("".join(text for text, _ in pages[:shown]) + (" ▌" if running and shown >= len(pages) else ""))
+    rest = pages[shown:]
+    if rest:
+        titles = [title for _, page_titles in rest for title in page_titles]
+        st.caption(f"{len(rest)} more part{'s' if len(rest) != 1 else ''}" + (f": {', '.join(titles)}" if titles else ""))
+        st.button("⬇️ Show more", key=f"more_{key}", on_click=show_more_pages, args=(shown_key,))
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def poll_generation_job(job_id):
+    """Re-render a running job's progress without rerunning the rest of the page"""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return
+    snapshot = job.snapshot()
+    if snapshot["status"] not in ACTIVE_STATUSES:
+        # Rerun the whole page once so the finished package is drawn without polling
+        st.rerun()
+    render_generation_job(job, snapshot)
+
+@st.fragment
+def show_finished_job(job_id):
+    """A finished package; switching sections or paging reruns only this viewer"""
+    with timed("fragment_results"):
+        job = get_job_manager().get(job_id)
+        if job is not None:
+            render_generation_job(job, job.snapshot())
+
+def show_generation_job():
+    """Show this session's most recent generation job, which survives reruns"""
+    job_id = st.session_state.get("generation_job_id")
+    if not job_id:
+        return
+    job = get_job_manager().get(job_id)
+    if job is None:
+        # Expired or started by a server process that has since restarted
+        del st.session_state["generation_job_id"]
+        return
+    if job.status in ACTIVE_STATUSES:
+        poll_generation_job(job_id)
+    else:
+        show_finished_job(job_id)
+
+def read_selection():
+    """
+    The form's selections, read from widget state because the widgets live in fragments.
+    A value that no longer fits the choice above it (e.g. a grade left over from another
+    content area) counts as unselected, as its selectbox would show it.
+    """
+    state = st.session_state
+    content_area = state.get("content_area_select") or ""
+    if content_area not in standards_index.content_areas(SELECTED_STATE):
+        content_area = ""
+    grade = state.get("grade_select") or ""
+    if not content_area or grade not in standards_index.grades(SELECTED_STATE, content_area):
+        grade = ""
+    standard = state.get("standard_select") or ""
+    if not grade or standard not in standards_index.standard_codes(SELECTED_STATE, content_area, grade):
+        standard = ""
+    standard_record = standards_index.lookup(standard, SELECTED_STATE, content_area) if standard else None
+    sub_standard = state.get("sub_standard_select") or ""
+    if standard_record is None or sub_standard not in standard_record.element_codes:
+        sub_standard = ""
+    return {
+        "state": SELECTED_STATE,
+        "content_area": content_area,
+        "grade": grade,
+        "standard": standard,
+        "sub_standard": sub_standard,
+        "standard_record": standard_record,
+        "sub_standard_record": standard_record.element(sub_standard) if sub_standard else None,
+        "group_size": state.get("group_size_select") or "",
+        "environment": state.get("environment_select") or "",
+        "time_allotment": state.get("time_select") or "",
+        "modifications": list(state.get("accessibility_select") or []),
+    }
+
+# Standards fields named in the "Missing required fields" warning, with their labels
+MISSING_FIELD_LABELS = (("state", "State"), ("content_area", "Content Area"), ("grade", "Grade Level"),
+                        ("standard", "Standard"), ("sub_standard", "Sub-Standard"))
+
+def form_state(selection):
+    """
+    What the page outside the form fragments depends on: whether Generate is offered, the
+    standards fields the warning lists as missing, and the sub-standard
+    """
+    ready = all(selection[field] for field in ("state", "content_area", "grade", "standard", "sub_standard",
+                                               "group_size", "environment", "time_allotment"))
+    missing = tuple(label for field, label in MISSING_FIELD_LABELS if not selection[field])
+    return ready, missing, selection["sub_standard"]
+
+def rerun_page_if_form_changed():
+    """
+    Form fragments rerun on their own; rerun the whole page only when a change matters outside
+    them (the form became complete or incomplete, the missing fields or the sub-standard changed)
+    """
+    if form_state(read_selection()) != st.session_state.get("form_state"):
+        st.rerun(scope="app")
+
+@st.fragment
+def standards_picker():
+    """Standards column: search and the content area → sub-standard cascade"""
+    with timed("fragment_standards"):
         st.markdown("""
         <div class="section-card">
             <div class="section-title">📚 Standards Selection</div>
         </div>
         """, unsafe_allow_html=True)
         
+        # Search jumps straight to a sub-standard and fills in the cascade below
+        search_query = st.text_input(
+            "🔎 Search Standards",
+            key="standards_search",
+            placeholder="Type a code or keywords, e.g. S8P1 or ratio",
+            help="Search standard codes, titles and sub-standard descriptions"
+        )
+        if search_query:
+            results = search_standards(search_query, limit=10, state=SELECTED_STATE)
+            if results:
+                results_by_code = {result.sub_standard: result for result in results}
+                st.selectbox(
+                    f"Matching sub-standards ({len(results)})",
+                    options=[""] + list(results_by_code),
+                    format_func=lambda code: results_by_code[code].label() if code else "Choose a result to fill in the selections below",
+                    key="search_result_select",
+                    on_change=apply_search_selection,
+                    args=(results_by_code,)
+                )
+            else:
+                st.caption("No matching standards found.")
+        
         # Content Area selection (Georgia only)
-        content_areas = get_content_areas(st.session_state.standards_data, selected_state)
+        content_areas = standards_index.content_areas(SELECTED_STATE)
         selected_content_area = st.selectbox(
             "📖 Content Area",
-            options=[""] + content_areas,
+            options=("",) + content_areas,
             key="content_area_select",
             help="Choose the subject area for your project"
         )
         
         if selected_content_area:
             # Grade selection
-            grades = get_grades(st.session_state.standards_data, selected_state, selected_content_area)
+            grades = standards_index.grades(SELECTED_STATE, selected_content_area)
             selected_grade = st.selectbox(
                 "🎯 Grade Level",
-                options=[""] + grades,
+                options=("",) + grades,
                 key="grade_select",
                 help="Select the target grade level"
             )
             
             if selected_grade:
                 # Standard selection
-                standards = get_standards(st.session_state.standards_data, selected_state, selected_content_area, selected_grade)
+                standard_codes = standards_index.standard_codes(SELECTED_STATE, selected_content_area, selected_grade)
                 selected_standard = st.selectbox(
                     "📋 Standard",
-                    options=[""] + list(standards.keys()),
+                    options=("",) + standard_codes,
                     key="standard_select",
                     help="Choose the specific standard to address"
                 )
                 
                 if selected_standard:
                     # Get standard info for display
-                    standard_info = standards[selected_standard]
+                    standard_record = standards_index.lookup(selected_standard, SELECTED_STATE, selected_content_area)
                     st.markdown(f"""
                     <div class="info-box">
-                        <strong>{selected_standard}:</strong> {standard_info.get('title', 'No title available')}
+                        <strong>{selected_standard}:</strong> {standard_record.title or 'No title available'}
                     </div>
                     """, unsafe_allow_html=True)
                     
                     # Sub-standard selection
-                    sub_standards = get_sub_standards(st.session_state.standards_data, selected_state, selected_content_area, selected_grade, selected_standard)
-                    if sub_standards:
+                    if standard_record.elements:
                         selected_sub_standard = st.selectbox(
                             "🎯 Sub-Standard",
-                            options=[""] + list(sub_standards.keys()),
+                            options=("",) + standard_record.element_codes,
                             key="sub_standard_select",
                             help="Choose specific learning element"
                         )
                         
                         if selected_sub_standard:
+                            sub_standard_record = standard_record.element(selected_sub_standard)
                             st.markdown(f"""
                             <div class="success-card">
-                                <strong>{selected_sub_standard}:</strong> {sub_standards[selected_sub_standard]}
+                                <strong>{selected_sub_standard}:</strong> {sub_standard_record.description}
                             </div>
                             """, unsafe_allow_html=True)
-    
-    with col2:
+    rerun_page_if_form_changed()
+
+@st.fragment
+def configuration_picker():
+    """Project configuration: group size, learning environment and duration"""
+    with timed("fragment_configuration"):
         st.markdown("""
         <div class="section-card">
             <div class="section-title">⚙️ Project Configuration</div>
@@ -216,8 +525,8 @@ def main():
         """, unsafe_allow_html=True)
         
         # Group size selection
-        group_options = ["Solo Project", "Pair Work", "Small Groups (3-4)", "Large Groups (5-6)"]
-        selected_group_size = st.selectbox(
+        group_options = [option.value for option in GroupSize]
+        st.selectbox(
             "👥 Group Size",
             options=[""] + group_options,
             key="group_size_select",
@@ -225,8 +534,8 @@ def main():
         )
         
         # Learning environment selection
-        environment_options = ["Brick & Mortar Classroom", "Virtual Learning Environment"]
-        selected_environment = st.selectbox(
+        environment_options = [option.value for option in LearningEnvironment]
+        st.selectbox(
             "🏫 Learning Environment",
             options=[""] + environment_options,
             key="environment_select",
@@ -234,15 +543,19 @@ def main():
         )
         
         # Time selection
-        time_options = ["1 Class Period", "2-3 Class Periods", "1 Week", "2 Weeks", "1 Month"]
-        selected_time = st.selectbox(
+        time_options = [option.value for option in TimeAllotment]
+        st.selectbox(
             "⏰ Project Duration",
             options=[""] + time_options,
             key="time_select",
             help="How much time should this project take?"
         )
-        
-        # Accessibility modifications
+    rerun_page_if_form_changed()
+
+@st.fragment
+def accessibility_picker():
+    """Accessibility modifications and their descriptions; only read when Generate is clicked"""
+    with timed("fragment_accessibility"):
         st.markdown("""
         <div class="section-card">
             <div class="section-title">♿ Accessibility Support</div>
@@ -263,94 +576,91 @@ def main():
                 descriptions = get_accessibility_descriptions()
                 for mod in selected_modifications:
                     st.write(f"**{mod}:** {descriptions.get(mod, 'No description available')}")
+
+def main():
+    # Modern header
+    st.markdown("""
+    <div class="header-container">
+        <h1 class="header-title">🍑 Georgia Middle School Project Generator</h1>
+        <p class="header-subtitle">Create comprehensive, standards-aligned educational projects with built-in accessibility support</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Widget values from the interaction that started this run are already in session state
+    selection = read_selection()
+    st.session_state.form_state = form_state(selection)
+    
+    # Create two columns for better layout. Each form section is a fragment: changing one of
+    # its widgets reruns only that section, not the header, the other column or the results.
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        standards_picker()
+    
+    with col2:
+        configuration_picker()
+        accessibility_picker()
     
     # Generation section
     st.markdown("---")
+    release_abandoned_job(selection["sub_standard"])
     
     # Check if all required fields are filled
-    can_generate = all([
-        selected_state,
-        selected_content_area,
-        selected_grade,
-        selected_standard,
-        selected_sub_standard,
-        selected_group_size,
-        selected_environment,
-        selected_time
-    ])
+    can_generate, missing_fields, _ = st.session_state.form_state
     
     if can_generate:
+        refresh_cache = st.checkbox(
+            "♻️ Generate a fresh version (ignore saved results)",
+            key="refresh_cache_check",
+            help="Previously generated packages for the same selections are reused instantly unless this is checked"
+        )
+        
         if st.button("🚀 Generate Comprehensive Project Package", type="primary", use_container_width=True):
-            with st.spinner("Generating comprehensive project package... This may take a moment."):
-                
-                # Prepare project configuration
-                project_config = {
-                    'state': selected_state,
-                    'content_area': selected_content_area,
-                    'grade': selected_grade,
-                    'standard': selected_standard,
-                    'standard_title': standard_info.get('title', ''),
-                    'sub_standard': selected_sub_standard,
-                    'sub_standard_description': sub_standards[selected_sub_standard],
-                    'group_size': selected_group_size,
-                    'environment': selected_environment,
-                    'time_allotment': selected_time,
-                    'accessibility_modifications': selected_modifications
-                }
-                
-                # Generate the project
-                result = generate_comprehensive_project(project_config)
-                
-                if result.startswith("❌"):
-                    st.error(result)
+            # Prepare project configuration
+            project_config = normalize_project_config({
+                'state': selection["state"],
+                'content_area': selection["content_area"],
+                'grade': selection["grade"],
+                'standard': selection["standard"],
+                'standard_title': selection["standard_record"].title,
+                'sub_standard': selection["sub_standard"],
+                'sub_standard_description': selection["sub_standard_record"].description,
+                'group_size': selection["group_size"],
+                'environment': selection["environment"],
+                'time_allotment': selection["time_allotment"],
+                'accessibility_modifications': selection["modifications"]
+            })
+            
+            # Fail fast while the model service is known to be down instead of queueing a doomed job
+            unavailable = model_unavailable_error()
+            if unavailable:
+                st.error(unavailable)
+            else:
+                # Runs in the background; the session only keeps the job ID, so reruns never lose it.
+                # The deadline bounds everything the job does, including its time in the queue.
+                try:
+                    job = get_job_manager().submit(project_config, refresh=refresh_cache,
+                                                   deadline=Deadline(GENERATION_DEADLINE_SECONDS),
+                                                   session_id=current_session_id(), session_alive=session_alive,
+                                                   profile=profile_requested())
+                except TokenBudgetError as e:
+                    # Refused before sending anything: a section cannot fit the model's context
+                    st.error(f"❌ {str(e)}")
                 else:
-                    st.success("✅ Project package generated successfully!")
-                    
-                    # Display the generated content
-                    st.markdown("## 📋 Generated Project Package")
-                    
-                    # Create tabs for different sections
-                    if selected_modifications:
-                        tab_names = ["Standard Project", "Formal Lesson Plan"] + [f"{mod} Version" for mod in selected_modifications]
-                    else:
-                        tab_names = ["Standard Project", "Formal Lesson Plan"]
-                    
-                    tabs = st.tabs(tab_names)
-                    
-                    # Parse the result to separate different sections
-                    sections = result.split("---SECTION_SEPARATOR---")
-                    
-                    with tabs[0]:
-                        st.markdown("### 📘 Standard Project")
-                        st.markdown(sections[0] if len(sections) > 0 else result)
-                    
-                    with tabs[1]:
-                        st.markdown("### 📄 Formal Lesson Plan")
-                        st.markdown(sections[1] if len(sections) > 1 else "Lesson plan included in main project.")
-                    
-                    # Accessibility modification tabs
-                    if selected_modifications and len(sections) > 2:
-                        for i, mod in enumerate(selected_modifications):
-                            with tabs[i + 2]:
-                                st.markdown(f"### ♿ {mod} Version")
-                                section_index = i + 2
-                                if section_index < len(sections):
-                                    st.markdown(sections[section_index])
-                                else:
-                                    st.markdown("Accessibility modifications included in main project.")
+                    st.session_state.generation_job_id = job.id
+                    st.session_state.generation_tab_order = selection["modifications"]
     else:
         st.info("👆 Please complete all required selections above to generate your project package.")
         
         # Show what's missing
-        missing_fields = []
-        if not selected_state: missing_fields.append("State")
-        if not selected_content_area: missing_fields.append("Content Area")
-        if not selected_grade: missing_fields.append("Grade Level")
-        if not selected_standard: missing_fields.append("Standard")
-        if not selected_sub_standard: missing_fields.append("Sub-Standard")
-        
         if missing_fields:
             st.warning(f"Missing required fields: {', '.join(missing_fields)}")
+    
+    show_generation_job()
 
 if __name__ == "__main__":
-    main()
+    try:
+        with timed("rerun"):
+            main()
+    finally:
+        rerun_profile.finish()
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the project generator
+Run individual benchmarks from the repository root, e.g. python -m benchmarks.standards_store_benchmark
+"""
@@ -0,0 +1,332 @@
+"""
+Offline load test with simulated teachers
+Starts the local OpenRouter stub (benchmarks.openrouter_stub), points the model client at it and
+has N teachers generate packages concurrently, each starting their next package as soon as the
+last one finishes. Configurations are drawn at random from the standards index into a fresh
+response cache, so every section is a cache miss. Modes:
+
+- direct: generate_comprehensive_project (fan-out, one request per section)
+- stream: generate_comprehensive_project_stream, the path generation jobs use
+- app: drives app.py through streamlit.testing, clicking Generate and polling until the job ends
+
+Reports throughput, package latency percentiles, errors, peak threads and RSS, stub counters
+and the per-span aggregates from tracing. --json saves the report; --baseline compares against
+a saved one and exits with status 1 when throughput, p95 latency, errors or memory regress by
+more than --tolerance.
+
+Usage:
+    python -m benchmarks.load_test [--teachers 20] [--packages 3] [--mode direct|stream|app]
+                                   [--rate-limit-rate 0.02] [--json report.json]
+                                   [--baseline report.json --tolerance 0.2]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.openrouter_stub import StubServer, add_stub_arguments, stub_config_from_args  # noqa: E402
+
+MODES = ("direct", "stream", "app")
+# How often the app-mode teacher reruns the page while waiting for its job
+APP_POLL_SECONDS = 0.5
+
+_teacher = threading.local()
+# Every AppTest run compiles app.py afresh, and concurrent compile() calls are not thread-safe
+# in CPython 3.11, so page runs take turns; the generation jobs they start still overlap
+_app_run_lock = threading.Lock()
+
+
+def use_teacher_sessions():
+    """
+    AppTest runs every app instance as the same fixed session ID, so concurrent teachers would
+    replace each other's jobs; give the runners created on each teacher's thread its own ID
+    """
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    init = LocalScriptRunner.__init__
+    if getattr(init, "teacher_sessions", False):
+        return
+
+    def teacher_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        self._session_id = getattr(_teacher, "session_id", self._session_id)
+
+    teacher_init.teacher_sessions = True
+    LocalScriptRunner.__init__ = teacher_init
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def rss_kb():
+    """Current and peak resident set size of this process in KB, from /proc (0 where unavailable)"""
+    values = {"VmRSS:": 0, "VmHWM:": 0}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key = line.split(":")[0] + ":"
+                if key in values:
+                    values[key] = int(line.split()[1])
+    except OSError:
+        pass
+    return values["VmRSS:"], values["VmHWM:"]
+
+
+class ResourceSampler:
+    """Samples thread count and RSS on a daemon thread while the load runs"""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak_threads = threading.active_count()
+        self.peak_rss_kb = rss_kb()[0]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="load-test-sampler")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+            self.peak_rss_kb = max(self.peak_rss_kb, rss_kb()[0])
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def pick_configs(count, seed):
+    """Distinct random configurations, so no two simulated teachers share cached sections"""
+    from bulk_generate import enumerate_configs
+    from standards_index import get_standards_index
+
+    configs = list(enumerate_configs(get_standards_index()))
+    return random.Random(seed).sample(configs, min(count, len(configs)))
+
+
+def generate_direct(config):
+    from project_generator import generate_comprehensive_project
+    from tracing import Trace
+
+    trace = Trace("load_test", sub_standard=config.sub_standard)
+    try:
+        return not generate_comprehensive_project(config, trace=trace).startswith("❌")
+    finally:
+        trace.finish()
+
+
+def generate_stream(config):
+    from project_generator import generate_comprehensive_project_stream
+    from tracing import Trace
+
+    trace = Trace("load_test", sub_standard=config.sub_standard)
+    failed = False
+    try:
+        for _, delta in generate_comprehensive_project_stream(config, trace=trace):
+            failed = failed or delta.startswith("❌")
+    finally:
+        trace.finish()
+    return not failed
+
+
+def generate_app(config, timeout):
+    """One teacher session: select the config's standard in app.py, click Generate and wait for the job"""
+    from streamlit.testing.v1 import AppTest
+    from generation_jobs import ACTIVE_STATUSES, JOB_DONE, get_job_manager
+
+    _teacher.session_id = f"load-test-{threading.get_ident()}"
+    at = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=timeout)
+
+    def run(element=at):
+        with _app_run_lock:
+            element.run()
+
+    run()
+    for key, value in (("content_area_select", config.content_area), ("grade_select", config.grade),
+                       ("standard_select", config.standard), ("sub_standard_select", config.sub_standard),
+                       ("group_size_select", config.group_size), ("environment_select", config.environment),
+                       ("time_select", config.time_allotment)):
+        run(at.selectbox(key=key).select(value))
+    run(at.button[0].click())
+    job = get_job_manager().get(at.session_state["generation_job_id"])
+    give_up = time.monotonic() + timeout
+    while job.status in ACTIVE_STATUSES and time.monotonic() < give_up:
+        time.sleep(APP_POLL_SECONDS)
+        run()
+    run()
+    return job.status == JOB_DONE and not at.exception
+
+
+def run_load(mode, teachers, packages, seed, timeout, log=print):
+    """Run the teachers and return (latencies, failures, elapsed seconds)"""
+    configs = pick_configs(teachers * packages, seed)
+    if mode == "app":
+        use_teacher_sessions()
+    generate = {"direct": generate_direct, "stream": generate_stream,
+                "app": lambda config: generate_app(config, timeout)}[mode]
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+
+    def teacher(number):
+        for config in configs[number::teachers]:
+            started = time.monotonic()
+            try:
+                ok = generate(config)
+                error = None if ok else "generation failed"
+            except Exception as e:
+                ok, error = False, f"{type(e).__name__}: {e}"
+            took = time.monotonic() - started
+            with lock:
+                latencies.append(took)
+                if not ok:
+                    failures.append(f"{config.sub_standard}: {error}")
+                done = len(latencies)
+            log(f"[{done}/{len(configs)}] teacher {number + 1} {'ok   ' if ok else 'error'} "
+                f"{config.sub_standard} in {took:.1f} s")
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=teacher, args=(number,), name=f"teacher-{number + 1}")
+               for number in range(teachers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, failures, time.monotonic() - started
+
+
+def build_report(args, latencies, failures, elapsed, sampler, stub):
+    from project_generator import get_model_client
+    from tracing import get_metrics
+
+    usage = get_model_client().usage_totals()
+    return {
+        "mode": args.mode,
+        "teachers": args.teachers,
+        "packages": len(latencies),
+        "errors": len(failures),
+        "error_rate": len(failures) / len(latencies) if latencies else 0.0,
+        "elapsed_seconds": elapsed,
+        "packages_per_minute": len(latencies) / elapsed * 60 if elapsed else 0.0,
+        "latency": {
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies, default=None),
+        },
+        "peak_threads": sampler.peak_threads,
+        "peak_rss_mb": max(sampler.peak_rss_kb, rss_kb()[1]) / 1024,
+        "requests": usage["requests"],
+        "completion_tokens": usage["completion_tokens"],
+        "stub": stub.stats(),
+        "spans": get_metrics().snapshot()["spans"],
+        "failures": failures[:20],
+    }
+
+
+def format_report(report):
+    latency = report["latency"]
+    stub = report["stub"]
+    lines = [
+        f"Load test: {report['teachers']} teachers, {report['mode']} mode",
+        f"  Packages:     {report['packages']} ({report['errors']} failed, {report['error_rate'] * 100:.1f}%)",
+        f"  Elapsed:      {report['elapsed_seconds']:.1f} s",
+        f"  Throughput:   {report['packages_per_minute']:.2f} packages/min",
+    ]
+    if latency["p50"] is not None:
+        lines.append(f"  Latency:      p50 {latency['p50']:.2f} s, p95 {latency['p95']:.2f} s, "
+                     f"p99 {latency['p99']:.2f} s, max {latency['max']:.2f} s")
+    lines += [
+        f"  Threads:      peak {report['peak_threads']}",
+        f"  Memory:       peak RSS {report['peak_rss_mb']:.1f} MB",
+        f"  Upstream:     {stub['requests']} requests ({stub['streams']} streamed), peak {stub['max_active']} "
+        f"concurrent; injected {stub['rate_limited']} 429s, {stub['server_errors']} 5xx, "
+        f"{stub['stream_errors']} stream errors",
+        "",
+        f"  {'span':<14}{'count':>8}{'errors':>8}{'p50 s':>10}{'p95 s':>10}{'p99 s':>10}",
+    ]
+    for name, stats in sorted(report["spans"].items()):
+        lines.append(f"  {name:<14}{stats['count']:>8}{stats['errors']:>8}"
+                     f"{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}")
+    lines += [f"  ✗ {failure}" for failure in report["failures"]]
+    return "\n".join(lines)
+
+
+def compare(report, baseline, tolerance):
+    """Regressions of report against baseline beyond tolerance, as messages"""
+    regressions = []
+    if report["packages_per_minute"] < baseline["packages_per_minute"] * (1 - tolerance):
+        regressions.append(f"throughput {report['packages_per_minute']:.2f} packages/min "
+                           f"< baseline {baseline['packages_per_minute']:.2f}")
+    if (report["latency"]["p95"] or 0) > (baseline["latency"]["p95"] or 0) * (1 + tolerance):
+        regressions.append(f"p95 latency {report['latency']['p95']:.2f} s > baseline {baseline['latency']['p95']:.2f} s")
+    if report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS {report['peak_rss_mb']:.1f} MB > baseline {baseline['peak_rss_mb']:.1f} MB")
+    if report["error_rate"] > baseline["error_rate"] + tolerance * 0.1:
+        regressions.append(f"error rate {report['error_rate'] * 100:.1f}% > baseline {baseline['error_rate'] * 100:.1f}%")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--teachers", type=int, default=20, help="Simulated teachers working at once")
+    parser.add_argument("--packages", type=int, default=3, help="Packages each teacher generates")
+    parser.add_argument("--mode", choices=MODES, default="direct")
+    parser.add_argument("--rpm", type=float, default=None,
+                        help="Client requests per minute (default: OPENROUTER_RPM; 0 disables the limiter)")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds an app-mode teacher waits for a job")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Report from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression against the baseline")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stub = StubServer(stub_config_from_args(args)).start()
+    cache_dir = tempfile.TemporaryDirectory()
+    # Configuration is read when the project modules are imported, so these must be set first
+    os.environ["MODEL_BACKENDS"] = json.dumps([{"name": "stub", "base_url": stub.base_url, "api_key": "stub"}])
+    os.environ["PROJECT_CACHE_PATH"] = os.path.join(cache_dir.name, "cache.db")
+    if args.rpm is not None:
+        os.environ["OPENROUTER_RPM"] = str(args.rpm)
+
+    print(f"Stub at {stub.base_url}; {args.teachers} teachers × {args.packages} packages in {args.mode} mode")
+    try:
+        with ResourceSampler() as sampler:
+            latencies, failures, elapsed = run_load(args.mode, args.teachers, args.packages, args.seed or 0,
+                                                    args.timeout)
+        report = build_report(args, latencies, failures, elapsed, sampler, stub)
+    finally:
+        stub.stop()
+        cache_dir.cleanup()
+
+    print()
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if regressions:
+            return 1
+        print(f"✅ Within {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""
+Local OpenRouter stand-in
+Serves POST /api/v1/chat/completions the way project_generator uses it: JSON completions and
+server-sent event streams (keep-alive comments, content deltas, a final usage block and
+[DONE]), on a keep-alive HTTP/1.1 server. Bodies are markdown sections shaped like real
+packages, one per SECTION_SEPARATOR in the prompt, and cut at max_tokens with
+finish_reason "length". Time to first token is log-normal and output streams at a fixed
+token rate; 429s (with Retry-After), 5xx responses and mid-stream errors can be injected.
+GET /stats returns request and fault counters.
+
+Usage:
+    python -m benchmarks.openrouter_stub [--port 8787] [--first-token-ms 800] [--tokens-per-second 80]
+                                         [--rate-limit-rate 0.02] [--server-error-rate 0.01]
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECTION_SEPARATOR = "---SECTION_SEPARATOR---"
+# Characters per token of the generated text, close to what the tokenizer sees for English markdown
+CHARS_PER_TOKEN = 4
+HEADINGS = (
+    "Project Overview", "Learning Objectives", "Materials & Resources", "Step-by-Step Instructions",
+    "Differentiation Strategies", "Assessment Rubric", "Timeline", "Extension Activities",
+)
+SENTENCES = (
+    "Students work through the driving question using evidence from hands-on investigation.",
+    "The teacher models the first step, then groups rotate through stations at their own pace.",
+    "Each checkpoint asks learners to explain their reasoning in writing and to a partner.",
+    "Sentence starters, visual organizers and chunked directions support every learner.",
+    "The rubric weighs scientific accuracy, collaboration and the quality of the final product.",
+    "Exit tickets give quick formative data that shapes the next day's small-group instruction.",
+)
+
+
+@dataclass
+class StubConfig:
+    """Latency and fault settings; rates are probabilities per request"""
+    first_token_ms: float = 800.0
+    # Spread (sigma of the underlying normal) of the log-normal time to first token
+    first_token_spread: float = 0.5
+    tokens_per_second: float = 80.0
+    # Mean output tokens per section; each section varies by +-30%
+    section_tokens: int = 900
+    chunk_tokens: int = 4
+    rate_limit_rate: float = 0.0
+    server_error_rate: float = 0.0
+    stream_error_rate: float = 0.0
+    retry_after_seconds: float = 1.0
+    seed: int = None
+
+
+def build_body(prompt, max_tokens, rng, section_tokens):
+    """Return (text, completion_tokens, finish_reason) for a prompt"""
+    sections = []
+    for index in range(prompt.count(SECTION_SEPARATOR) + 1):
+        target = int(section_tokens * rng.uniform(0.7, 1.3)) * CHARS_PER_TOKEN
+        lines = [f"# Section {index + 1}"]
+        while sum(len(line) + 1 for line in lines) < target:
+            lines.append(f"\n### {rng.choice(HEADINGS)}")
+            lines.extend(f"- {rng.choice(SENTENCES)}" for _ in range(rng.randint(3, 6)))
+        sections.append("\n".join(lines))
+    text = f"\n\n{SECTION_SEPARATOR}\n\n".join(sections)
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) > limit:
+        return text[:limit], max_tokens, "length"
+    return text, math.ceil(len(text) / CHARS_PER_TOKEN), "stop"
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop pooled keep-alive connections and cancel streams; neither is a stub failure
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """The stub on a background thread; base_url is what a ModelClient or MODEL_BACKENDS entry needs"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StubConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0, "streams": 0, "active": 0, "max_active": 0, "completion_tokens": 0,
+            "rate_limited": 0, "server_errors": 0, "stream_errors": 0,
+        }
+        self._server = _QuietServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="openrouter-stub")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+            if key == "active":
+                self._stats["max_active"] = max(self._stats["max_active"], self._stats["active"])
+
+    def _random(self):
+        """A per-request generator, seeded from the shared one so runs with a seed repeat"""
+        with self._rng_lock:
+            return random.Random(self._rng.random())
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path != "/stats":
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+                self._send_json(200, stub.stats())
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found"}})
+                    return
+                stub._count("requests")
+                stub._count("active")
+                try:
+                    self._complete(body, stub._random())
+                finally:
+                    stub._count("active", -1)
+
+            def _complete(self, body, rng):
+                config = stub.config
+                roll = rng.random()
+                if roll < config.rate_limit_rate:
+                    stub._count("rate_limited")
+                    self._send_json(429, {"error": {"message": "Rate limit exceeded"}},
+                                    {"Retry-After": f"{config.retry_after_seconds:g}"})
+                    return
+                if roll < config.rate_limit_rate + config.server_error_rate:
+                    stub._count("server_errors")
+                    self._send_json(rng.choice((500, 502, 503)), {"error": {"message": "Upstream error"}})
+                    return
+
+                prompt = body["messages"][-1]["content"]
+                text, completion_tokens, finish_reason = build_body(
+                    prompt, body.get("max_tokens") or 4000, rng, config.section_tokens
+                )
+                prompt_tokens = math.ceil(sum(len(m["content"]) for m in body["messages"]) / CHARS_PER_TOKEN)
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+                first_token = rng.lognormvariate(math.log(config.first_token_ms / 1000), config.first_token_spread)
+                stub._count("completion_tokens", completion_tokens)
+
+                if not body.get("stream"):
+                    time.sleep(first_token + completion_tokens / config.tokens_per_second)
+                    self._send_json(200, {
+                        "id": "gen-stub", "model": body.get("model"),
+                        "choices": [{"message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}],
+                        "usage": usage,
+                    })
+                    return
+
+                stub._count("streams")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                self._send_chunk(": OPENROUTER PROCESSING\n\n")
+                time.sleep(first_token)
+                fail_at = len(text) * rng.random() if rng.random() < config.stream_error_rate else None
+                step = config.chunk_tokens * CHARS_PER_TOKEN
+                for start in range(0, len(text), step):
+                    if fail_at is not None and start >= fail_at:
+                        stub._count("stream_errors")
+                        self._send_event({"error": {"message": "Stream interrupted by the stub", "code": 502}})
+                        break
+                    self._send_event({"choices": [{"delta": {"content": text[start:start + step]}}]})
+                    time.sleep(config.chunk_tokens / config.tokens_per_second)
+                else:
+                    self._send_event({"choices": [{"delta": {}, "finish_reason": finish_reason}], "usage": usage})
+                    self._send_chunk("data: [DONE]\n\n")
+                self._send_chunk("")
+
+            def _send_event(self, event):
+                self._send_chunk(f"data: {json.dumps(event)}\n\n")
+
+            def _send_chunk(self, data):
+                payload = data.encode("utf-8")
+                try:
+                    self.wfile.write(f"{len(payload):x}\r\n".encode() + payload + b"\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client cancelled the stream; stop generating for it
+                    self.close_connection = True
+                    raise
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def add_stub_arguments(parser):
+    """Add the StubConfig options to an argparse parser"""
+    defaults = StubConfig()
+    parser.add_argument("--first-token-ms", type=float, default=defaults.first_token_ms,
+                        help="Median time to first token (ms)")
+    parser.add_argument("--first-token-spread", type=float, default=defaults.first_token_spread,
+                        help="Log-normal sigma of the time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--section-tokens", type=int, default=defaults.section_tokens,
+                        help="Mean output tokens per section")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="Share of requests answered with 5xx")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="Share of streams cut by an error event")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def stub_config_from_args(args):
+    return StubConfig(
+        first_token_ms=args.first_token_ms,
+        first_token_spread=args.first_token_spread,
+        tokens_per_second=args.tokens_per_second,
+        section_tokens=args.section_tokens,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        stream_error_rate=args.stream_error_rate,
+        seed=args.seed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = StubServer(stub_config_from_args(args), host=args.host, port=args.port).start()
+    print(f"OpenRouter stub listening on {server.base_url}")
+    print(f'Point the app at it with MODEL_BACKENDS=\'[{{"name": "stub", "base_url": "{server.base_url}", "api_key": "stub"}}]\'')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
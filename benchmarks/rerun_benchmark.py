@@ -0,0 +1,163 @@
+"""
+Per-interaction server time, full-page reruns vs form fragments
+Generates one package through app.py against the local OpenRouter stub and reports how much
+text the results view sends, then repeats common interactions. For each it reports:
+
+- full page: the whole script run, which is what every interaction cost before the form was split into fragments
+- fragment: what the interaction costs now, i.e. only the fragment owning the widget, plus a
+  full page run when the change affects the rest of the page (e.g. a new sub-standard)
+
+streamlit.testing always runs the whole script, so both numbers come from the timings app.py
+records for each page run and each fragment within it.
+
+Usage:
+    python -m benchmarks.rerun_benchmark [--repeat 20] [--section-tokens 3000] [--modifications 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.openrouter_stub import StubConfig, StubServer  # noqa: E402
+
+CONFIG = {
+    "content_area_select": "Science",
+    "grade_select": "8th",
+    "standard_select": "S8P1",
+    "sub_standard_select": "S8P1.a",
+    "group_size_select": "Pair Work",
+    "environment_select": "Virtual Learning Environment",
+    "time_select": "1 Week",
+}
+
+
+def interactions(modifications):
+    """(label, fragment that reruns, widget kind, key, two values to alternate between)"""
+    return [
+        ("Group size", "fragment_configuration", "selectbox", "group_size_select", ("Small Groups (3-4)", "Pair Work")),
+        ("Project duration", "fragment_configuration", "selectbox", "time_select", ("2 Weeks", "1 Week")),
+        ("Modifications", "fragment_accessibility", "multiselect", "accessibility_select",
+         (modifications[:-1], modifications)),
+        ("Search box", "fragment_standards", "text_input", "standards_search", ("ratio", "force")),
+        ("Result section", "fragment_results", "radio", "result_section", (len(modifications) + 1, 0)),
+        ("Sub-standard", "fragment_standards", "selectbox", "sub_standard_select", ("S8P1.b", "S8P1.a")),
+    ]
+
+
+def timings():
+    from tracing import get_metrics
+
+    return {name: (stats["count"], stats["seconds"]) for name, stats in get_metrics().snapshot()["spans"].items()}
+
+
+def set_widget(at, kind, key, value):
+    widget = getattr(at, kind)(key=key)
+    if kind == "multiselect":
+        for option in list(widget.value):
+            widget.unselect(option)
+        for option in value:
+            widget.select(option)
+    elif kind == "text_input":
+        widget.input(value)
+    elif kind == "radio":
+        widget.set_value(value)
+    else:
+        widget.select(value)
+    widget.run()
+
+
+def page_chars(at):
+    """Characters of text the page sends, a proxy for the browser payload"""
+    return sum(len(element.value) for kind in ("markdown", "caption", "info", "success", "warning", "error")
+               for element in getattr(at, kind))
+
+
+def generate_package(at, modifications, timeout=120):
+    from generation_jobs import ACTIVE_STATUSES, get_job_manager
+
+    at.run()
+    for key, value in CONFIG.items():
+        at.selectbox(key=key).select(value).run()
+    set_widget(at, "multiselect", "accessibility_select", modifications)
+    form_chars = page_chars(at)
+    at.button[0].click().run()
+    job = get_job_manager().get(at.session_state["generation_job_id"])
+    give_up = time.monotonic() + timeout
+    while job.status in ACTIVE_STATUSES and time.monotonic() < give_up:
+        time.sleep(0.2)
+    at.run()
+    return job, page_chars(at) - form_chars
+
+
+def measure(at, repeat, modifications):
+    """Mean (full page, fragment) server seconds per interaction"""
+    results = []
+    for label, fragment, kind, key, values in interactions(modifications):
+        full = after = 0.0
+        for index in range(repeat):
+            before = timings()
+            form_state = at.session_state["form_state"]
+            set_widget(at, kind, key, values[index % 2])
+            now = timings()
+            page = now["rerun"][1] - before["rerun"][1]
+            full += page
+            after += now[fragment][1] - before.get(fragment, (0, 0.0))[1]
+            # On a live page the fragment then asks for a full rerun, as the change matters outside it
+            if at.session_state["form_state"] != form_state:
+                after += page
+        results.append({"interaction": label, "fragment": fragment,
+                        "full_page_ms": full / repeat * 1000, "fragment_ms": after / repeat * 1000})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=20, help="Times each interaction is repeated")
+    parser.add_argument("--section-tokens", type=int, default=3000, help="Size of each generated section")
+    parser.add_argument("--modifications", type=int, default=10, help="Accessibility modifications in the package")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    stub = StubServer(StubConfig(first_token_ms=50, tokens_per_second=50000, section_tokens=args.section_tokens,
+                                 seed=0)).start()
+    cache_dir = tempfile.TemporaryDirectory()
+    # Configuration is read when the project modules are imported, so these must be set first
+    os.environ["MODEL_BACKENDS"] = json.dumps([{"name": "stub", "base_url": stub.base_url, "api_key": "stub"}])
+    os.environ["PROJECT_CACHE_PATH"] = os.path.join(cache_dir.name, "cache.db")
+    from streamlit.testing.v1 import AppTest
+    from accessibility_modifications import get_accessibility_options
+
+    modifications = get_accessibility_options()[:max(1, args.modifications)]
+    try:
+        at = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=60)
+        job, sent_chars = generate_package(at, modifications)
+        if at.exception or job.status != "done":
+            print(f"❌ Error: the package was not generated ({job.status})", file=sys.stderr)
+            return 1
+        package_chars = sum(len(section.text) for section in job.snapshot()["document"].sections.values())
+        results = measure(at, args.repeat, modifications)
+    finally:
+        stub.stop()
+        cache_dir.cleanup()
+
+    print(f"Package: {len(modifications) + 2} sections, {package_chars / 1000:.0f}k characters; "
+          f"the results view sends {sent_chars / 1000:.1f}k characters of text")
+    print(f"Server time per interaction with the package on screen (mean of {args.repeat})")
+    print(f"{'interaction':<18}{'full page ms':>14}{'fragment ms':>14}{'speedup':>10}")
+    for result in results:
+        speedup = result["full_page_ms"] / result["fragment_ms"] if result["fragment_ms"] else float("inf")
+        print(f"{result['interaction']:<18}{result['full_page_ms']:>14.1f}{result['fragment_ms']:>14.1f}{speedup:>9.1f}×")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"package_chars": package_chars, "page_chars": sent_chars, "interactions": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Standards store scaling benchmark
+Builds synthetic stores 1x, 10x and 100x the size of the bundled data (by cloning it into extra
+states with unique codes) and measures, in a fresh interpreter for each size:
+
+- startup: importing the index, building it and resolving one full dropdown cascade
+- peak RSS after startup
+- the same two numbers after forcing every partition to load, for comparison
+
+Usage:
+    python -m benchmarks.standards_store_benchmark [--scales 1 10 100]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from standards_store import DEFAULT_STORE_DIR, LazyStandardsData, StandardsStore, write_store  # noqa: E402
+
+PROBE = r"""
+import json, resource, sys, time
+
+def peak_rss_kb():
+    # ru_maxrss survives exec on Linux and would report the parent's peak, so prefer VmHWM
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+started = time.perf_counter()
+from standards_index import get_standards_index
+index = get_standards_index()
+state = index.states()[0]
+area = index.content_areas(state)[0]
+grade = index.grades(state, area)[0]
+code = index.standard_codes(state, area, grade)[0]
+index.lookup(code, state, area).element_codes
+startup = time.perf_counter() - started
+startup_rss = peak_rss_kb()
+if "--full" in sys.argv:
+    sum(len(record.elements) for record in index.iter_standards())
+full = time.perf_counter() - started
+print(json.dumps({
+    "startup_ms": startup * 1000,
+    "startup_rss_kb": startup_rss,
+    "full_ms": full * 1000,
+    "full_rss_kb": peak_rss_kb(),
+}))
+"""
+
+
+def build_scaled_data(base, scale):
+    """Clone every state in base into scale states with unique names and codes"""
+    data = {}
+    for copy in range(scale):
+        for state, area_map in base.items():
+            name = state if copy == 0 else f"{state} {copy:03d}"
+            suffix = "" if copy == 0 else f"-{copy:03d}"
+            data[name] = {
+                content_area: {
+                    grade: {
+                        code + suffix: {
+                            "title": info["title"],
+                            "elements": {
+                                element_code + suffix: description
+                                for element_code, description in info["elements"].items()
+                            },
+                        }
+                        for code, info in standard_map.items()
+                    }
+                    for grade, standard_map in grade_map.items()
+                }
+                for content_area, grade_map in area_map.items()
+            }
+    return data
+
+
+def materialize(mapping):
+    """Turn a lazy standards mapping into plain nested dicts"""
+    return {
+        key: materialize(value) if hasattr(value, "items") else value
+        for key, value in mapping.items()
+    }
+
+
+def probe(store_dir, full):
+    env = dict(os.environ, STANDARDS_DATA_DIR=store_dir, PYTHONPATH=REPO_ROOT)
+    args = [sys.executable, "-c", PROBE] + (["--full"] if full else [])
+    output = subprocess.run(args, env=env, cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args(argv)
+
+    base = materialize(LazyStandardsData(StandardsStore(DEFAULT_STORE_DIR)))
+    print(f"{'scale':>6} {'states':>7} {'elements':>9} {'startup ms':>11} {'startup RSS MB':>15} "
+          f"{'full load ms':>13} {'full RSS MB':>12}")
+    for scale in args.scales:
+        data = build_scaled_data(base, scale)
+        elements = sum(
+            len(info["elements"])
+            for area_map in data.values()
+            for grade_map in area_map.values()
+            for standard_map in grade_map.values()
+            for info in standard_map.values()
+        )
+        with tempfile.TemporaryDirectory() as store_dir:
+            write_store(data, store_dir, indent=None)
+            lazy = probe(store_dir, full=False)
+            full = probe(store_dir, full=True)
+        print(f"{scale:>5}x {len(data):>7} {elements:>9} {lazy['startup_ms']:>11.1f} "
+              f"{lazy['startup_rss_kb'] / 1024:>15.1f} {full['full_ms']:>13.1f} {full['full_rss_kb'] / 1024:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Headless bulk generation of project packages
+Enumerates configurations from the standards database and writes one JSONL record per package.
+Re-running with the same output file resumes: packages already written with status "ok" are skipped.
+
+Example:
+    python bulk_generate.py --output packages.jsonl --content-area Science --grade 8th --workers 4 --rate 20
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from circuit_breaker import get_circuit_breaker
+from hedging import get_hedge_policy
+from project_config import GroupSize, LearningEnvironment, TimeAllotment, normalize_project_config
+from project_generator import MODEL, generate_comprehensive_project, get_model_client
+from rate_limiter import get_rate_limiter
+from standards_index import get_standards_index
+from tracing import Trace, export_metrics_jsonl, get_metrics, start_exporters
+
+
+def enumerate_configs(standards_index, states=None, content_areas=None, grades=None, standards=None,
+                      environments=None, group_sizes=None, time_allotments=None, modifications=()):
+    """
+    Yield a ProjectConfig for every matching sub-standard and environment/group size/time combination.
+    Filters left as None match everything.
+    """
+    environments = environments or list(LearningEnvironment)
+    group_sizes = group_sizes or list(GroupSize)
+    time_allotments = time_allotments or [TimeAllotment.ONE_WEEK]
+
+    for record in standards_index.iter_standards():
+        if ((states and record.state not in states)
+                or (content_areas and record.content_area not in content_areas)
+                or (grades and record.grade not in grades)
+                or (standards and record.code not in standards)):
+            continue
+        for element in record.elements:
+            for environment, group_size, time_allotment in itertools.product(
+                    environments, group_sizes, time_allotments):
+                yield normalize_project_config({
+                    'state': record.state,
+                    'content_area': record.content_area,
+                    'grade': record.grade,
+                    'standard': record.code,
+                    'standard_title': record.title,
+                    'sub_standard': element.code,
+                    'sub_standard_description': element.description,
+                    'group_size': group_size,
+                    'environment': environment,
+                    'time_allotment': time_allotment,
+                    'accessibility_modifications': modifications
+                })
+
+
+def load_completed_ids(path):
+    """Return the ids already written successfully to a JSONL output file"""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a partial last line; that package is simply regenerated
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+
+class RateLimiter:
+    """Spaces calls evenly so no more than per_minute start in any minute"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+
+class JsonlWriter:
+    """Thread-safe, append-only JSONL writer that flushes every record to disk"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def generate_one(config, limiter, use_cache):
+    """Generate a single package and return its output record"""
+    limiter.wait()
+    started = time.monotonic()
+    trace = Trace("bulk", trace_id=config.digest, sub_standard=config.sub_standard)
+    meta = {}
+    try:
+        result = generate_comprehensive_project(config, use_cache=use_cache, trace=trace, meta=meta)
+    finally:
+        trace.finish()
+    failed = result.startswith("❌")
+    missing = [] if failed else meta.get("missing_sections", [])
+    # Counted from this package's own spans: the cache's counters are shared with every process using it
+    cached = sum(1 for span in trace.spans() if span["name"] == "section" and span["attrs"].get("cache") == "hit")
+    return {
+        "id": config.digest,
+        "status": "error" if failed else "ok",
+        "config": config.to_dict(),
+        "result": None if failed else result,
+        "error": result if failed else None,
+        "missing_sections": missing,
+        "cached_sections": cached,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def run(configs, output_path, workers=4, rate_per_minute=None, use_cache=True, log=print):
+    """
+    Generate every config not already completed in output_path and return a summary dict
+    """
+    completed = load_completed_ids(output_path)
+    configs = list(dict.fromkeys(configs))
+    pending = [config for config in configs if config.digest not in completed]
+    # Only packages selected for this run count; the output file may hold others from earlier filters
+    skipped = len(configs) - len(pending)
+
+    limiter = RateLimiter(rate_per_minute)
+    writer = JsonlWriter(output_path)
+    client = get_model_client()
+    usage_before = client.usage_totals()
+    counts = {"ok": 0, "error": 0}
+    cache_hits = 0
+    started = time.monotonic()
+
+    log(f"{len(pending)} packages to generate ({skipped} already completed in {output_path})")
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bulk")
+    try:
+        futures = {executor.submit(generate_one, config, limiter, use_cache): config for config in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            config = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {
+                    "id": config.digest,
+                    "status": "error",
+                    "config": config.to_dict(),
+                    "result": None,
+                    "error": f"❌ Error: Unexpected error occurred - {str(e)}",
+                    "missing_sections": [],
+                    "cached_sections": 0,
+                    "elapsed_seconds": None,
+                    "finished_at": datetime.now(timezone.utc).isoformat(),
+                }
+            writer.write(record)
+            counts[record["status"]] += 1
+            cache_hits += record["cached_sections"]
+            log(f"[{done}/{len(pending)}] {record['status']:5} {config.sub_standard} · "
+                f"{config.environment} · {config.group_size} · {config.time_allotment}"
+                + (f" — {record['error']}" if record["error"] else ""))
+    except KeyboardInterrupt:
+        log("Interrupted; finished packages are saved and will be skipped on the next run")
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        writer.close()
+
+    elapsed = time.monotonic() - started
+    usage_after = client.usage_totals()
+    return {
+        "generated": counts["ok"],
+        "errors": counts["error"],
+        "skipped": skipped,
+        "elapsed_seconds": elapsed,
+        "packages_per_minute": (counts["ok"] + counts["error"]) / elapsed * 60 if elapsed else 0.0,
+        "requests": usage_after["requests"] - usage_before["requests"],
+        "prompt_tokens": usage_after["prompt_tokens"] - usage_before["prompt_tokens"],
+        "completion_tokens": usage_after["completion_tokens"] - usage_before["completion_tokens"],
+        "truncated": usage_after["truncated"] - usage_before["truncated"],
+        "cancelled": usage_after["cancelled"] - usage_before["cancelled"],
+        "cancelled_tokens": usage_after["cancelled_tokens"] - usage_before["cancelled_tokens"],
+        "estimate_accuracy": client.estimate_accuracy(),
+        "rate_limiter": get_rate_limiter(MODEL).stats(),
+        "backends": client.backend_stats(),
+        "hedging": get_hedge_policy().stats(),
+        "circuit": get_circuit_breaker(MODEL).stats(),
+        "cache_hits": cache_hits,
+        "latency": get_metrics().snapshot(),
+    }
+
+
+def format_summary(summary):
+    """Human-readable end-of-run report"""
+    attempted = summary["generated"] + summary["errors"]
+    limiter = summary["rate_limiter"]
+    hedging = summary["hedging"]
+    spans = summary["latency"]["spans"]
+    circuit = summary["circuit"]
+    error_rate = summary["errors"] / attempted * 100 if attempted else 0.0
+    return "\n".join([
+        "Bulk generation summary",
+        f"  Generated:    {summary['generated']}",
+        f"  Errors:       {summary['errors']} ({error_rate:.1f}%)",
+        f"  Skipped:      {summary['skipped']} (already completed)",
+        f"  Elapsed:      {summary['elapsed_seconds']:.1f} s",
+        f"  Throughput:   {summary['packages_per_minute']:.2f} packages/min",
+        f"  API requests: {summary['requests']} ({summary['cache_hits']} sections served from cache)",
+        f"  Tokens:       {summary['prompt_tokens']} prompt + {summary['completion_tokens']} completion",
+        f"  Truncated:    {summary['truncated']} sections hit their output budget",
+        f"  Cancelled:    {summary['cancelled']} streams closed early (~{summary['cancelled_tokens']} tokens discarded)",
+        f"  Queueing:     {limiter['waited']} requests waited for the rate limiter "
+        f"(mean {limiter['mean_wait_seconds']:.1f} s, max {limiter['max_wait_seconds']:.1f} s), "
+        f"peak queue {limiter['max_queued']}, {limiter['timeouts']} timed out",
+        f"  Hedging:      {hedging['hedges']} slow requests hedged, {hedging['fallbacks']} fell back after an error; "
+        f"wins {', '.join(f'{model} {wins}' for model, wins in hedging['wins'].items()) or 'none'}",
+        f"  Circuit:      {circuit['state']}, opened {circuit['opened']} times, "
+        f"{circuit['rejected']} requests refused while open",
+    ] + [
+        f"  Latency:      {name:<12} p50 {spans[name]['p50']:.2f} s, p95 {spans[name]['p95']:.2f} s, "
+        f"p99 {spans[name]['p99']:.2f} s ({spans[name]['errors']} of {spans[name]['count']} failed)"
+        for name in ("queue", "request", "first_token", "stream", "section") if name in spans
+    ] + ([
+        f"  Streaming:    {summary['latency']['tokens_per_second']:.1f} completion tokens/s",
+    ] if "stream" in spans else []) + ([
+        f"  Estimates:    reported prompt tokens were {summary['estimate_accuracy']:.2f}× the local estimate"
+    ] if summary["estimate_accuracy"] else []) + ([
+        f"  Backend {backend['name']}: {backend['requests']} requests, {backend['failures']} failed "
+        f"({backend['rate_limited']} rate limited), mean {backend['mean_latency_seconds']:.2f} s to first byte"
+        for backend in summary["backends"]
+    ] if len(summary["backends"]) > 1 else []))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Pre-generate project packages for many standards at once.")
+    parser.add_argument("--output", required=True, help="JSONL file to append results to (also used to resume)")
+    parser.add_argument("--state", action="append", dest="states", help="Limit to a state (repeatable)")
+    parser.add_argument("--content-area", action="append", dest="content_areas", help="Limit to a content area (repeatable)")
+    parser.add_argument("--grade", action="append", dest="grades", help="Limit to a grade, e.g. 8th (repeatable)")
+    parser.add_argument("--standard", action="append", dest="standards", help="Limit to a standard code (repeatable)")
+    parser.add_argument("--environment", action="append", dest="environments",
+                        help="Learning environment (repeatable; default: all)")
+    parser.add_argument("--group-size", action="append", dest="group_sizes",
+                        help="Group size (repeatable; default: all)")
+    parser.add_argument("--time-allotment", action="append", dest="time_allotments",
+                        help=f"Project duration (repeatable; default: {TimeAllotment.ONE_WEEK})")
+    parser.add_argument("--modification", action="append", dest="modifications", default=[],
+                        help="Accessibility modification included in every package (repeatable)")
+    parser.add_argument("--workers", type=int, default=4, help="Packages generated at the same time (default: 4)")
+    parser.add_argument("--rate", type=float, default=None, help="Maximum packages started per minute")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many matching packages")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the response cache")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        configs = enumerate_configs(
+            get_standards_index(),
+            states=args.states,
+            content_areas=args.content_areas,
+            grades=args.grades,
+            standards=args.standards,
+            environments=args.environments,
+            group_sizes=args.group_sizes,
+            time_allotments=args.time_allotments,
+            modifications=args.modifications,
+        )
+        configs = list(itertools.islice(configs, args.limit))
+    except ValueError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 2
+
+    if not configs:
+        print("No standards match the given filters.", file=sys.stderr)
+        return 1
+
+    start_exporters()
+    summary = run(configs, args.output, workers=args.workers, rate_per_minute=args.rate, use_cache=not args.no_cache)
+    export_metrics_jsonl()
+    print(format_summary(summary))
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Circuit breaking for model requests
+When a model's recent requests mostly fail or time out, its breaker opens and further requests
+are refused immediately instead of each waiting out its own timeout. After a cool-off a few
+probe requests are let through (half-open); the breaker closes again once one succeeds.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Share of failed requests, among at least FAILURE_MIN_REQUESTS in the window, that opens the breaker
+FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+FAILURE_MIN_REQUESTS = int(os.getenv("CIRCUIT_MIN_REQUESTS", "10"))
+FAILURE_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+# How long an open breaker refuses requests before probing
+OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+# Requests let through at once while half-open
+HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+
+class CircuitOpenError(Exception):
+    """The breaker is refusing requests; retry_after is the number of seconds until it probes again"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Requests are paused for about {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+
+class _Attempt:
+    """One request admitted by a breaker; report its outcome with succeeded() or failed()"""
+
+    def __init__(self, breaker, probe):
+        self._breaker = breaker
+        self._probe = probe
+        self._reported = False
+
+    def succeeded(self):
+        self._report(True)
+
+    def failed(self):
+        self._report(False)
+
+    def _report(self, ok):
+        if not self._reported:
+            self._reported = True
+            self._breaker._record(ok, self._probe)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Cancelled or refused for reasons unrelated to the upstream: free the probe slot only
+        if not self._reported:
+            self._reported = True
+            self._breaker._release(self._probe)
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker over a rolling window of request outcomes.
+    attempt() raises CircuitOpenError while open; otherwise use the returned attempt as a
+    context manager around the request and report how it went.
+    """
+
+    def __init__(self, failure_rate=FAILURE_RATE, min_requests=FAILURE_MIN_REQUESTS,
+                 window_seconds=FAILURE_WINDOW_SECONDS, open_seconds=OPEN_SECONDS, half_open_probes=HALF_OPEN_PROBES):
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._outcomes = deque()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def retry_after(self):
+        """Seconds until requests are let through again; 0 when they are now"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def attempt(self):
+        """Admit one request or raise CircuitOpenError"""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN:
+                wait = self._opened_at + self.open_seconds - now
+                if wait > 0:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(wait)
+                self._state = HALF_OPEN
+                self._probes = 0
+            if self._state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self._stats["rejected"] += 1
+                    raise CircuitOpenError(self.open_seconds)
+                self._probes += 1
+                return _Attempt(self, probe=True)
+            return _Attempt(self, probe=False)
+
+    def _open(self, now):
+        """Call with the lock held"""
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._stats["opened"] += 1
+
+    def _record(self, ok, probe):
+        with self._lock:
+            now = time.monotonic()
+            if probe:
+                if self._state == HALF_OPEN:
+                    self._probes -= 1
+                    if ok:
+                        self._state = CLOSED
+                    else:
+                        self._open(now)
+                return
+            # Late results from before the breaker opened do not count towards the next window
+            if self._state != CLOSED:
+                return
+            self._outcomes.append((now, ok))
+            while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+                self._outcomes.popleft()
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            if len(self._outcomes) >= self.min_requests and failures >= self.failure_rate * len(self._outcomes):
+                self._open(now)
+
+    def _release(self, probe):
+        with self._lock:
+            if probe and self._state == HALF_OPEN:
+                self._probes -= 1
+
+    def stats(self):
+        """Current state, how often the breaker opened and how many requests it refused"""
+        with self._lock:
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return dict(self._stats, state=self._state, window_requests=len(self._outcomes), window_failures=failures)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(model):
+    """Return the process-wide breaker for a model"""
+    with _breakers_lock:
+        breaker = _breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            _breakers[model] = breaker
+        return breaker
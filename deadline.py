@@ -0,0 +1,64 @@
+"""
+End-to-end deadlines
+A Deadline is created once per generation and passed down to every request made for it, so
+queueing, retries, timeouts and streams all stop once the overall time budget is spent.
+Cancelling a deadline stops the same work early, e.g. when nobody is waiting for it any more.
+Functions that take a deadline accept None for no limit.
+"""
+
+import os
+import time
+
+# Overall time allowed for one package generation started from the app
+GENERATION_DEADLINE_SECONDS = float(os.getenv("GENERATION_DEADLINE_SECONDS", "300"))
+
+
+class DeadlineExceeded(Exception):
+    """The overall time budget ran out before the work finished"""
+
+
+class Cancelled(DeadlineExceeded):
+    """The work was cancelled before it finished"""
+
+
+class Deadline:
+    """
+    A point in time by which a piece of work, and everything it calls, must finish.
+    seconds may be math.inf for work that is only ever stopped by cancel().
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.cancelled = False
+
+    def cancel(self):
+        """Expire the deadline now; work checking it stops with Cancelled"""
+        self.cancelled = True
+
+    def remaining(self):
+        """Seconds left, never negative"""
+        if self.cancelled:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.cancelled or time.monotonic() >= self.expires_at
+
+    def check(self):
+        """Raise Cancelled or DeadlineExceeded once the deadline has been cancelled or has passed"""
+        if self.cancelled:
+            raise Cancelled("The work was cancelled")
+        if self.expired:
+            raise DeadlineExceeded(f"The {self.seconds:.0f} s time limit was reached")
+
+    def cap(self, seconds):
+        """Limit a wait or timeout to the time left; raises DeadlineExceeded if none is"""
+        self.check()
+        return min(seconds, self.remaining())
+
+
+def cap(deadline, seconds):
+    """Limit seconds to what is left of deadline, which may be None for no limit"""
+    return seconds if deadline is None else deadline.cap(seconds)
@@ -0,0 +1,292 @@
+"""
+Background generation jobs
+Packages are generated on a process-wide executor instead of the Streamlit script thread.
+Sessions keep only a job ID, so reruns never interrupt, lose or repeat a generation, and the
+page can poll a job's progress while the teacher keeps editing the form. A job that no session
+is waiting for any more is cancelled, which closes its upstream streams.
+"""
+
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from deadline import Deadline
+from profiling import profiled
+from project_config import normalize_project_config
+from project_generator import (ProjectDocument, SectionParser, build_section_jobs, check_token_budget,
+                               generate_comprehensive_project_stream, is_truncated)
+from tracing import Trace
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+ACTIVE_STATUSES = frozenset({JOB_QUEUED, JOB_RUNNING})
+
+# Packages generated at the same time across all sessions; each package also fans out its sections
+JOB_WORKERS = int(os.getenv("PROJECT_JOB_WORKERS", "4"))
+# Finished jobs are kept this long so a session can still display them after reruns
+JOB_RETENTION_SECONDS = float(os.getenv("PROJECT_JOB_RETENTION_SECONDS", "3600"))
+# How often sessions waiting on jobs are checked for disconnects
+SESSION_CHECK_SECONDS = float(os.getenv("PROJECT_JOB_SESSION_CHECK_SECONDS", "2"))
+
+# Reasons a job is cancelled, shown to the teacher
+CANCEL_REPLACED = "a different package was requested"
+CANCEL_RELEASED = "a different standard was selected"
+CANCEL_DISCONNECTED = "the page was closed"
+
+
+class GenerationJob:
+    """
+    One package generation. Each section's deltas are parsed as they stream in (see
+    SectionParser); read the resulting document through snapshot() because the worker thread
+    keeps writing while the page renders.
+    The job's deadline doubles as its cancellation token (see cancel()), and its trace (whose
+    ID is the job ID) records where the generation's time went.
+    """
+
+    def __init__(self, config, refresh=False, warnings=(), deadline=None, profile=False):
+        self.id = uuid.uuid4().hex
+        self.config = config
+        self.refresh = refresh
+        # Requests for the same package share a job only when they agree on refresh
+        self.dedup_key = (config.digest, bool(refresh))
+        self.profile = profile
+        self.deadline = deadline if deadline is not None else Deadline(math.inf)
+        self.trace = Trace("generation", trace_id=self.id, sub_standard=config.sub_standard)
+        self._queued = self.trace.start_span("job_queue")
+        self.warnings = tuple(warnings)
+        self.created_at = time.time()
+        self._lock = threading.Lock()
+        self._status = JOB_QUEUED
+        self._started_at = None
+        self._finished_at = None
+        self._section_jobs = build_section_jobs(config)
+        self._parsers = [SectionParser([section_job], split=False) for section_job in self._section_jobs]
+        self._errors = {}
+        self._failure = None
+        self._cancel_reason = None
+        self._final_snapshot = None
+
+    @property
+    def status(self):
+        with self._lock:
+            return self._status
+
+    @property
+    def finished_at(self):
+        with self._lock:
+            return self._finished_at
+
+    def cancel(self, reason):
+        """
+        Stop the job: queued jobs never start, and running streams are closed at their next
+        delta. Sections that already finished stay cached.
+        """
+        with self._lock:
+            if self._status not in ACTIVE_STATUSES or self._cancel_reason is not None:
+                return
+            self._cancel_reason = reason
+        self.deadline.cancel()
+
+    def run(self):
+        """Generate the package, recording every streamed delta; runs on the job executor"""
+        with self._lock:
+            self._status = JOB_RUNNING
+            self._started_at = time.time()
+        self._queued.finish()
+        # Anything that goes wrong, profiling included, must end the job; a job left running would
+        # have every later request for the same package attached to it
+        try:
+            with profiled("generation", self.profile, label=self.id):
+                stream = generate_comprehensive_project_stream(self.config, refresh=self.refresh,
+                                                               deadline=self.deadline, trace=self.trace)
+                try:
+                    for index, delta in stream:
+                        if self.deadline.cancelled:
+                            break
+                        with self._lock:
+                            if delta.startswith("❌"):
+                                self._errors[self._section_jobs[index].key] = delta
+                            else:
+                                self._parsers[index].feed(delta)
+                    status = JOB_CANCELLED if self.deadline.cancelled else JOB_DONE
+                finally:
+                    # Closes every section stream still running, and with them their sockets
+                    stream.close()
+        except Exception as e:
+            self._failure = f"❌ Error: Unexpected error occurred - {str(e)}"
+            status = JOB_FAILED
+        with self._lock:
+            self._status = status
+            self._finished_at = time.time()
+        self.trace.attrs["status"] = status
+        self.trace.finish()
+
+    def snapshot(self):
+        """
+        Return a consistent copy of the job's progress. "truncated" lists the keys of sections
+        that were cut short (see project_generator.TRUNCATED_NOTICE). A finished job never
+        changes, so its snapshot is built once and the same (read-only) dict is returned from then on.
+        """
+        with self._lock:
+            if self._final_snapshot is not None:
+                return self._final_snapshot
+            now = self._finished_at or time.time()
+            document = self._document()
+            snapshot = {
+                "id": self.id,
+                "status": self._status,
+                "document": document,
+                "errors": dict(self._errors),
+                "truncated": [key for key, section in document.sections.items() if is_truncated(section.text)],
+                "failure": self._failure,
+                "cancel_reason": self._cancel_reason,
+                "warnings": self.warnings,
+                "elapsed_seconds": now - self._started_at if self._started_at else 0.0,
+                "finished_at": self._finished_at,
+            }
+            if self._status not in ACTIVE_STATUSES:
+                self._final_snapshot = snapshot
+            return snapshot
+
+    def _document(self):
+        """The package parsed so far, sections keyed by (kind, modification); call with the lock held"""
+        if self._status not in ACTIVE_STATUSES:
+            sections = [parser.close().sections.get(section_job.key)
+                        for parser, section_job in zip(self._parsers, self._section_jobs)]
+        else:
+            sections = [parser.section() for parser in self._parsers]
+        return ProjectDocument({section.key: section for section in sections if section is not None and section.text},
+                               tuple(section_job.key for section_job in self._section_jobs))
+
+
+class JobManager:
+    """
+    Runs GenerationJobs on a bounded executor.
+    Submitting a config that already has a queued or running job returns that job instead of
+    starting another, so double clicks and reruns never pay for the same package twice. A
+    refresh is only shared with another refresh: it never attaches to a job that may reuse
+    cached sections.
+    Jobs submitted for a session are cancelled once no session is waiting for them: the
+    session moved on to another package, released it, or disconnected.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS,
+                 session_check_seconds=SESSION_CHECK_SECONDS):
+        self.retention_seconds = retention_seconds
+        self.session_check_seconds = session_check_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = {}
+        # session ID -> (job the session is waiting for, callable telling whether the session is alive)
+        self._sessions = {}
+        self._session_checker = None
+
+    def submit(self, config, refresh=False, deadline=None, session_id=None, session_alive=None, profile=False):
+        """
+        Queue a package for generation and return its job.
+        deadline (a Deadline, or None) covers the time the job waits in the queue as well.
+        With session_id the job is tied to that session, replacing (and cancelling, unless
+        another session shares it) the session's previous job; session_alive(session_id)
+        should return False once the session has disconnected. profile writes a CPU and
+        allocation profile of the generation (see profiling.py).
+        Raises TokenBudgetError (before queueing anything) when a request cannot fit the model.
+        """
+        config = normalize_project_config(config)
+        dedup_key = (config.digest, bool(refresh))
+        with self._lock:
+            self._prune()
+            job = self._active.get(dedup_key)
+            if job is not None and job.status in ACTIVE_STATUSES:
+                self._attach(session_id, job, session_alive)
+                return job
+
+        warnings = check_token_budget(config)
+        with self._lock:
+            # Another session may have submitted the same package while the budget was checked
+            job = self._active.get(dedup_key)
+            if job is not None and job.status in ACTIVE_STATUSES:
+                self._attach(session_id, job, session_alive)
+                return job
+            job = GenerationJob(config, refresh=refresh, warnings=warnings, deadline=deadline, profile=profile)
+            self._jobs[job.id] = job
+            self._active[dedup_key] = job
+            self._attach(session_id, job, session_alive)
+        self._executor.submit(job.run)
+        return job
+
+    def release(self, session_id, reason=CANCEL_RELEASED):
+        """The session no longer wants its job; cancel the job unless another session does"""
+        with self._lock:
+            self._detach(session_id, reason)
+
+    def _attach(self, session_id, job, session_alive):
+        """Record that a session waits for job; call with the lock held"""
+        if session_id is None:
+            return
+        previous = self._sessions.get(session_id)
+        if previous is not None and previous[0] is not job:
+            self._detach(session_id, CANCEL_REPLACED)
+        self._sessions[session_id] = (job, session_alive)
+        if self._session_checker is None:
+            self._session_checker = threading.Thread(target=self._check_sessions, daemon=True, name="job-sessions")
+            self._session_checker.start()
+
+    def _detach(self, session_id, reason):
+        """Forget a session's job and cancel the job if nobody else waits for it; call with the lock held"""
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return
+        job = entry[0]
+        if not any(waiting is job for waiting, _ in self._sessions.values()):
+            job.cancel(reason)
+
+    def _check_sessions(self):
+        """Detach disconnected sessions, cancelling jobs left without one; runs on its own thread"""
+        while True:
+            time.sleep(self.session_check_seconds)
+            with self._lock:
+                sessions = list(self._sessions.items())
+            # Liveness checks run outside the lock; they may call into the web server
+            gone = [session_id for session_id, (_, alive) in sessions if alive is not None and not alive(session_id)]
+            with self._lock:
+                for session_id in gone:
+                    self._detach(session_id, CANCEL_DISCONNECTED)
+                for session_id, (job, _) in list(self._sessions.items()):
+                    if job.status not in ACTIVE_STATUSES:
+                        del self._sessions[session_id]
+
+    def get(self, job_id):
+        """Return a job by ID, or None once it has expired (or was never submitted here)"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        """Forget finished jobs older than retention_seconds; call with the lock held"""
+        cutoff = time.time() - self.retention_seconds
+        for job_id, job in list(self._jobs.items()):
+            finished_at = job.finished_at
+            if finished_at is not None and finished_at < cutoff:
+                del self._jobs[job_id]
+                if self._active.get(job.dedup_key) is job:
+                    del self._active[job.dedup_key]
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Return the process-wide JobManager"""
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager()
+    return _job_manager
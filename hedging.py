@@ -0,0 +1,236 @@
+"""
+Hedged requests across an ordered list of models
+The primary model gets a head start. If it has not produced a first chunk by an adaptive
+threshold (its recent p95, capped by the model's SLO) a hedge request goes to the next model;
+whichever responds first wins and the other is cancelled. Errors fall through to the next
+model immediately. Only the slow tail is hedged, and a hedge budget caps the extra spend.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+# Recent first-chunk latencies kept per model
+LATENCY_WINDOW = int(os.getenv("HEDGE_LATENCY_WINDOW", "200"))
+# Samples needed before the p95 replaces the SLO as the hedge threshold
+MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+# Never hedge sooner than this, however fast the model usually is
+MIN_HEDGE_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "1.0"))
+# Most requests that may be hedged, as a fraction of all requests
+MAX_HEDGE_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+
+STREAM = "stream"
+COMPLETE = "complete"
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """A model in the hedge order with its latency SLOs (seconds to first chunk / full response)"""
+    model: str
+    first_token_slo: float
+    total_slo: float
+
+    def slo(self, kind):
+        return self.first_token_slo if kind == STREAM else self.total_slo
+
+
+class LatencyWindow:
+    """Rolling window of latency samples with percentile lookups"""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def record(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class HedgePolicy:
+    """Latency windows per (model, kind) and the hedge budget shared by all requests"""
+
+    def __init__(self, window=LATENCY_WINDOW, min_samples=MIN_SAMPLES, min_delay=MIN_HEDGE_DELAY,
+                 max_hedge_ratio=MAX_HEDGE_RATIO):
+        self.window = window
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._counts = {"requests": 0, "hedges": 0, "fallbacks": 0}
+        self._wins = {}
+
+    def _window(self, model, kind):
+        key = (model, kind)
+        if key not in self._windows:
+            self._windows[key] = LatencyWindow(self.window)
+        return self._windows[key]
+
+    def hedge_delay(self, route, kind):
+        """Seconds to wait for route's first chunk before hedging: its p95, capped by its SLO"""
+        with self._lock:
+            window = self._window(route.model, kind)
+            if len(window) < self.min_samples:
+                return route.slo(kind)
+            return min(route.slo(kind), max(self.min_delay, window.percentile(0.95)))
+
+    def record(self, model, kind, seconds):
+        with self._lock:
+            self._window(model, kind).record(seconds)
+
+    def start_request(self):
+        with self._lock:
+            self._counts["requests"] += 1
+
+    def try_hedge(self):
+        """Spend one hedge from the budget; False once hedges would exceed max_hedge_ratio"""
+        with self._lock:
+            # One hedge is always allowed so a cold start can still hedge its first slow request
+            if self._counts["hedges"] >= self.max_hedge_ratio * self._counts["requests"] + 1:
+                return False
+            self._counts["hedges"] += 1
+            return True
+
+    def record_fallback(self):
+        with self._lock:
+            self._counts["fallbacks"] += 1
+
+    def record_win(self, model):
+        with self._lock:
+            self._wins[model] = self._wins.get(model, 0) + 1
+
+    def stats(self):
+        """Request, hedge and fallback counts, wins per model and latency percentiles per (model, kind)"""
+        with self._lock:
+            return dict(
+                self._counts,
+                wins=dict(self._wins),
+                latency={
+                    f"{model} ({kind})": {
+                        "samples": len(window),
+                        "p50": window.percentile(0.5),
+                        "p95": window.percentile(0.95),
+                        "p99": window.percentile(0.99),
+                    }
+                    for (model, kind), window in self._windows.items()
+                },
+            )
+
+
+def hedged(start_attempt, routes, policy, kind=STREAM):
+    """
+    Yield the chunks of the first of routes to respond.
+    start_attempt(model) returns an iterator of text chunks for one model, ending with a chunk
+    starting with "❌" on failure. Each attempt runs on its own thread; losers stop at their
+    next chunk, which closes their response. Yields the last error when every model fails.
+    Returns (as the generator's return value) the winning model, or None when none won.
+    """
+    events = queue.Queue()
+    attempts = []
+    pending = set()
+    last_error = None
+    policy.start_request()
+
+    def run(index, model, cancel):
+        iterator = start_attempt(model)
+        try:
+            for chunk in iterator:
+                if cancel.is_set():
+                    break
+                events.put((index, chunk))
+        except Exception as e:
+            events.put((index, f"❌ Error: Unexpected error occurred - {str(e)}"))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            events.put((index, None))
+
+    def launch():
+        index = len(attempts)
+        cancel = threading.Event()
+        attempts.append((routes[index], cancel, time.monotonic()))
+        pending.add(index)
+        threading.Thread(target=run, args=(index, routes[index].model, cancel), daemon=True, name="hedge").start()
+
+    launch()
+    winner = None
+    hedging = True
+    try:
+        while winner is None:
+            timeout = None
+            if hedging and len(attempts) < len(routes):
+                route, _, started = attempts[-1]
+                timeout = max(0.0, started + policy.hedge_delay(route, kind) - time.monotonic())
+            try:
+                index, chunk = events.get(timeout=timeout)
+            except queue.Empty:
+                if policy.try_hedge():
+                    launch()
+                else:
+                    # Out of hedge budget: wait on what is already running (errors still fall back)
+                    hedging = False
+                continue
+
+            if chunk is None or chunk.startswith("❌"):
+                if index not in pending:
+                    continue
+                if chunk is not None:
+                    last_error = chunk
+                pending.discard(index)
+                if not pending:
+                    if len(attempts) < len(routes):
+                        policy.record_fallback()
+                        launch()
+                    else:
+                        if last_error:
+                            yield last_error
+                        return
+                continue
+
+            winner = index
+            now = time.monotonic()
+            for other, (route, cancel, started) in enumerate(attempts):
+                if other == winner:
+                    policy.record(route.model, kind, now - started)
+                elif other in pending:
+                    # Censored sample: the loser had not answered after this long
+                    policy.record(route.model, kind, now - started)
+                    cancel.set()
+            policy.record_win(attempts[winner][0].model)
+            yield chunk
+
+        while True:
+            index, chunk = events.get()
+            if index != winner:
+                continue
+            if chunk is None:
+                return attempts[winner][0].model
+            yield chunk
+    finally:
+        for _, cancel, _ in attempts:
+            cancel.set()
+
+
+_hedge_policy = None
+_hedge_policy_lock = threading.Lock()
+
+
+def get_hedge_policy():
+    """Return the process-wide HedgePolicy"""
+    global _hedge_policy
+    if _hedge_policy is None:
+        with _hedge_policy_lock:
+            if _hedge_policy is None:
+                _hedge_policy = HedgePolicy()
+    return _hedge_policy
@@ -0,0 +1,214 @@
+"""
+Opt-in CPU and allocation profiling
+Wraps a piece of work (a page rerun, a generation job) in cProfile and tracemalloc and writes
+three files per run to PROFILE_DIR:
+
+- <name>.prof: raw cProfile stats, for pstats or snakeviz
+- <name>.collapsed: collapsed stacks ("frame;frame;frame microseconds"), for flamegraph.pl or speedscope
+- <name>.alloc.txt: the top PROFILE_TOP_ALLOCATIONS source lines by memory allocated during the run
+
+Profiling is off unless a session is sampled (PROFILE_SAMPLE_RATE) or asks for it, and a run
+that is not profiled gets a no-op stand-in, so leaving the hook in costs nothing.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Where profile files are written
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Fraction of sessions whose reruns and generations are profiled (0 turns sampling off)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOP_ALLOCATIONS = int(os.getenv("PROFILE_TOP_ALLOCATIONS", "25"))
+# Call paths shorter than this are dropped from the collapsed stacks to keep them readable
+COLLAPSED_MIN_SECONDS = 1e-5
+COLLAPSED_MAX_DEPTH = 128
+
+
+def sample_session():
+    """Decide, once per session, whether the session is profiled"""
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class Profile:
+    """
+    CPU and allocation profile of one run. cProfile sees only the thread that calls start()
+    (work it hands to other threads shows up as waiting); tracemalloc sees every thread, so
+    allocations made by concurrent work are included in the report.
+    """
+
+    def __init__(self, kind, label=None, directory=None):
+        self.kind = kind
+        self.label = label
+        self.directory = directory or PROFILE_DIR
+        self.paths = []
+        self._profiler = None
+        self._snapshot = None
+        self._started = None
+
+    def start(self):
+        """
+        Start profiling and return the profile. Since Python 3.12 only one cProfile can run at a
+        time; when another is already active this run goes unprofiled and NO_PROFILE is returned.
+        """
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            logger.warning("Not profiling this %s: %s", self.kind, e)
+            return NO_PROFILE
+        _start_tracemalloc()
+        self._snapshot = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self._profiler = profiler
+        return self
+
+    def finish(self):
+        """Stop profiling and write the reports; returns their paths"""
+        if self._profiler is None:
+            return self.paths
+        self._profiler.disable()
+        seconds = time.perf_counter() - self._started
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        _stop_tracemalloc()
+
+        os.makedirs(self.directory, exist_ok=True)
+        name = "-".join(filter(None, (self.kind, time.strftime("%Y%m%d-%H%M%S"), self.label, uuid.uuid4().hex[:6])))
+        base = os.path.join(self.directory, name)
+        self._profiler.dump_stats(f"{base}.prof")
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            for stack, microseconds in collapsed_stacks(self._profiler):
+                f.write(f"{stack} {microseconds}\n")
+        with open(f"{base}.alloc.txt", "w", encoding="utf-8") as f:
+            f.write(allocation_report(self._snapshot, snapshot, seconds, peak))
+        self._profiler = None
+        self._snapshot = None
+        self.paths = [f"{base}.prof", f"{base}.collapsed", f"{base}.alloc.txt"]
+        return self.paths
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.finish()
+
+
+class _NoProfile:
+    """Stands in for a Profile when the run is not profiled"""
+
+    paths = []
+
+    def start(self):
+        return self
+
+    def finish(self):
+        return self.paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NO_PROFILE = _NoProfile()
+
+
+def profiled(kind, enabled, label=None):
+    """A Profile for the run when enabled, otherwise the no-op NO_PROFILE"""
+    return Profile(kind, label) if enabled else NO_PROFILE
+
+
+def _frame_label(func):
+    filename, line, name = func
+    if filename == "~":
+        # Built-ins are reported as ("~", 0, "<built-in method ...>")
+        return name.replace(";", ",")
+    return f"{os.path.basename(filename)}:{name}:{line}".replace(";", ",")
+
+
+def collapsed_stacks(profiler):
+    """
+    Yield (stack, microseconds) pairs rebuilt from cProfile's caller/callee totals. cProfile does
+    not keep full stacks, so a function called from several places has its time split between
+    those call paths in proportion to what each caller spent in it.
+    """
+    stats = pstats.Stats(profiler).stats
+    callees = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees[caller][func] = cumulative
+    totals = defaultdict(float)
+
+    def walk(func, seconds, path, on_path):
+        _, _, own, cumulative, _ = stats[func]
+        share = seconds / cumulative if cumulative else 0.0
+        path = path + (_frame_label(func),)
+        if own * share >= COLLAPSED_MIN_SECONDS:
+            totals[";".join(path)] += own * share
+        if len(path) >= COLLAPSED_MAX_DEPTH:
+            return
+        for callee, spent in callees.get(func, {}).items():
+            if callee not in on_path and spent * share >= COLLAPSED_MIN_SECONDS:
+                walk(callee, spent * share, path, on_path | {callee})
+
+    for func, (_, _, _, cumulative, callers) in stats.items():
+        if not callers:
+            walk(func, cumulative, (), {func})
+    for stack, seconds in sorted(totals.items()):
+        yield stack, round(seconds * 1_000_000)
+
+
+def allocation_report(before, after, seconds, peak):
+    """Top source lines by memory allocated between two tracemalloc snapshots"""
+    # Leave out the profilers' own bookkeeping
+    ignore = [tracemalloc.Filter(False, path)
+              for path in (tracemalloc.__file__, cProfile.__file__, pstats.__file__, __file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    growth = [stat for stat in stats if stat.size_diff > 0][:PROFILE_TOP_ALLOCATIONS]
+    lines = [
+        f"Wall time: {seconds * 1000:.1f} ms",
+        f"Allocated and still held: {sum(stat.size_diff for stat in stats) / 1024:.1f} KiB "
+        f"(traced peak {peak / 1024:.1f} KiB, all threads)",
+        "",
+        f"Top {len(growth)} lines by memory allocated:",
+    ]
+    for stat in growth:
+        frame = stat.traceback[0]
+        lines.append(f"  {stat.size_diff / 1024:10.1f} KiB  {stat.count_diff:+8d} blocks  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines) + "\n"
+
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def _start_tracemalloc():
+    """tracemalloc is process-wide; keep it on while any profile runs"""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc():
+    """Turn tracemalloc off after the last profile, unless something else had started it"""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
@@ -0,0 +1,137 @@
+"""
+Canonical project configuration
+Normalizes form selections so logically equivalent requests build identical prompts and cache keys
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass, fields
+from enum import StrEnum
+from functools import cached_property
+
+from accessibility_modifications import get_accessibility_options
+
+
+# Fields every generated section depends on; a modification only affects its own section
+SECTION_FIELDS = (
+    'state', 'content_area', 'grade', 'standard', 'standard_title', 'sub_standard',
+    'sub_standard_description', 'group_size', 'environment', 'time_allotment',
+)
+
+
+class GroupSize(StrEnum):
+    SOLO = "Solo Project"
+    PAIR = "Pair Work"
+    SMALL_GROUPS = "Small Groups (3-4)"
+    LARGE_GROUPS = "Large Groups (5-6)"
+
+
+class LearningEnvironment(StrEnum):
+    BRICK_AND_MORTAR = "Brick & Mortar Classroom"
+    VIRTUAL = "Virtual Learning Environment"
+
+
+class TimeAllotment(StrEnum):
+    ONE_CLASS_PERIOD = "1 Class Period"
+    TWO_TO_THREE_CLASS_PERIODS = "2-3 Class Periods"
+    ONE_WEEK = "1 Week"
+    TWO_WEEKS = "2 Weeks"
+    ONE_MONTH = "1 Month"
+
+
+def _fold(value):
+    """Case- and whitespace-insensitive comparison form of a label"""
+    return " ".join(str(value).split()).casefold()
+
+
+def _canonical_enum(enum_cls, value):
+    """Map a label, member name or member to its enum member"""
+    if isinstance(value, enum_cls):
+        return value
+    folded = _fold(value)
+    for member in enum_cls:
+        if folded in (_fold(member.value), _fold(member.name)):
+            return member
+    raise ValueError(f"Unknown {enum_cls.__name__} value: {value!r}")
+
+
+def canonical_modifications(modifications):
+    """
+    Return modifications as a de-duplicated tuple in canonical order.
+    Known options follow the order of get_accessibility_options(); anything else is sorted after them.
+    """
+    known = {_fold(option): option for option in get_accessibility_options()}
+    rank = {option: i for i, option in enumerate(get_accessibility_options())}
+    selected = set()
+    for modification in modifications or ():
+        selected.add(known.get(_fold(modification), " ".join(str(modification).split())))
+    return tuple(sorted(selected, key=lambda m: (rank.get(m, len(rank)), m)))
+
+
+@dataclass(frozen=True)
+class ProjectConfig:
+    """
+    Immutable, hashable form of the project configuration built in app.py.
+    Use normalize_project_config() rather than constructing it directly.
+    """
+    state: str
+    content_area: str
+    grade: str
+    standard: str
+    standard_title: str
+    sub_standard: str
+    sub_standard_description: str
+    group_size: GroupSize
+    environment: LearningEnvironment
+    time_allotment: TimeAllotment
+    accessibility_modifications: tuple = ()
+
+    @classmethod
+    def from_dict(cls, config):
+        """Build a canonical config from the plain dict used by the UI"""
+        return cls(
+            state=str(config['state']).strip(),
+            content_area=str(config['content_area']).strip(),
+            grade=str(config['grade']).strip(),
+            standard=str(config['standard']).strip(),
+            standard_title=str(config.get('standard_title', '')).strip(),
+            sub_standard=str(config['sub_standard']).strip(),
+            sub_standard_description=str(config.get('sub_standard_description', '')).strip(),
+            group_size=_canonical_enum(GroupSize, config['group_size']),
+            environment=_canonical_enum(LearningEnvironment, config['environment']),
+            time_allotment=_canonical_enum(TimeAllotment, config['time_allotment']),
+            accessibility_modifications=canonical_modifications(config.get('accessibility_modifications')),
+        )
+
+    def to_dict(self):
+        """Return the config as a plain, JSON-serializable dict"""
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        for name in ('group_size', 'environment', 'time_allotment'):
+            data[name] = data[name].value
+        data['accessibility_modifications'] = list(self.accessibility_modifications)
+        return data
+
+    @cached_property
+    def digest(self):
+        """Stable hex digest identifying this logical request"""
+        payload = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def section_digest(self, section, modification=None):
+        """
+        Stable hex digest of the fields one section depends on.
+        Other modifications are left out, so adding or removing one keeps every other section's digest.
+        """
+        data = self.to_dict()
+        payload = json.dumps(
+            {"section": section, "modification": modification, **{name: data[name] for name in SECTION_FIELDS}},
+            sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_project_config(config):
+    """Return config as a ProjectConfig, accepting either a dict or an existing ProjectConfig"""
+    if isinstance(config, ProjectConfig):
+        return config
+    return ProjectConfig.from_dict(config)
@@ -1,47 +1,874 @@
 import requests
+import json
 import os
+import queue
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+
+from project_config import normalize_project_config
+from response_cache import get_response_cache, make_cache_key, make_section_cache_key
+from rate_limiter import RateLimitTimeout, get_rate_limiter
+from single_flight import get_single_flight
+from circuit_breaker import CircuitOpenError, get_circuit_breaker
+from deadline import DeadlineExceeded, cap
+from hedging import COMPLETE, STREAM, ModelRoute, get_hedge_policy, hedged
+from tracing import span, start_span
+from token_budget import TokenBudgetError, estimate_tokens, plan_budget
 
 # Get API key from environment variable with fallback
 API_KEY = os.getenv("OPENROUTER_API_KEY")
-def generate_comprehensive_project(config):
+
+MODEL = "mistralai/mistral-7b-instruct"
+FALLBACK_MODEL = "meta-llama/llama-3.1-8b-instruct"
+MAX_TOKENS = 4000
+TEMPERATURE = 0.7
+SECTION_SEPARATOR = "---SECTION_SEPARATOR---"
+SECTION_STANDARD_PROJECT = "standard_project"
+SECTION_LESSON_PLAN = "lesson_plan"
+SECTION_MODIFICATION = "modification"
+# Output tokens requested for each kind of section; a request's budget is the sum of its sections
+SECTION_OUTPUT_TOKENS = {
+    SECTION_STANDARD_PROJECT: 2500,
+    SECTION_LESSON_PLAN: 2000,
+    SECTION_MODIFICATION: 1200,
+}
+# Maximum number of sections generated at the same time for one package
+SECTION_CONCURRENCY = int(os.getenv("PROJECT_SECTION_CONCURRENCY", "4"))
+# Continuation requests made for a section cut off at its output budget before giving up
+MAX_CONTINUATIONS = int(os.getenv("PROJECT_MAX_CONTINUATIONS", "2"))
+# Appended to a section still cut off after its continuations, so it is not mistaken for a finished one
+TRUNCATED_NOTICE = "⚠️ *This section was cut short at the model's output limit and may be incomplete.*"
+# A section still cut off is cached only this long: packages generated soon after reuse it instead of
+# paying for it again, and later ones get another try at finishing it
+TRUNCATED_SECTION_TTL_SECONDS = float(os.getenv("PROJECT_TRUNCATED_SECTION_TTL_SECONDS", "3600"))
+# Characters of already-generated text sent as context with a continuation or fill-in request
+REPAIR_CONTEXT_CHARS = int(os.getenv("PROJECT_REPAIR_CONTEXT_CHARS", "6000"))
+# A continuation that starts by repeating at least this much of the text before it has the repeat trimmed
+CONTINUATION_MIN_OVERLAP = 20
+CONTINUATION_MAX_OVERLAP = 300
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+# Requests time out on connect or on silence between chunks, never on total duration
+CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", "60"))
+# Keep-alive connections kept per host; should cover concurrent sections across all sessions
+POOL_SIZE = int(os.getenv("OPENROUTER_POOL_SIZE", "16"))
+MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "3"))
+# Models tried in order, each with latency SLOs in seconds to the first chunk (streams) and to the
+# full response; e.g. [{"model": "...", "first_token_slo": 5, "total_slo": 45}, ...]
+MODEL_CHAIN = [
+    ModelRoute(route["model"], float(route.get("first_token_slo", 5.0)), float(route.get("total_slo", 45.0)))
+    for route in json.loads(os.getenv("MODEL_CHAIN", "[]")) or [
+        {"model": MODEL, "first_token_slo": 5.0, "total_slo": 45.0},
+        {"model": FALLBACK_MODEL, "first_token_slo": 5.0, "total_slo": 45.0},
+    ]
+]
+RATE_LIMIT_ERROR = "❌ Error: Too many projects are being generated right now. Please try again in a minute."
+DEADLINE_ERROR = "❌ Error: Generation ran out of time and was stopped. Please try again."
+CANCELLED_ERROR = "❌ Error: Generation was cancelled."
+SYSTEM_PROMPT = "You are an expert educational curriculum designer, special education specialist, and lesson planning professional. You create comprehensive, standards-aligned educational materials that are engaging, grade-appropriate, rigorous, and accessible. Your responses are detailed, practical, and ready for immediate classroom implementation."
+
+# Bump whenever SYSTEM_PROMPT or the section templates change so stale cached sections are not reused
+SECTION_CACHE_VERSION = 1
+
+@dataclass(frozen=True)
+class SectionJob:
+    """One independently generated section of the project package"""
+    kind: str
+    prompt: str
+    modification: str = None
+    cache_key: str = None
+
+    @property
+    def max_tokens(self):
+        return SECTION_OUTPUT_TOKENS[self.kind]
+
+    @property
+    def key(self):
+        return (self.kind, self.modification)
+
+    @property
+    def label(self):
+        return section_label(self.kind, self.modification)
+
+def section_label(kind, modification=None):
+    """Name of a section as shown to teachers"""
+    return modification or {
+        SECTION_STANDARD_PROJECT: "Standard Project",
+        SECTION_LESSON_PLAN: "Lesson Plan",
+    }.get(kind, "Unrecognized section")
+
+# Markdown headings the parser tracks: # and ## start sections, ## and ### are their subsections
+HEADING_PATTERN = re.compile(r"^(#{1,3})[ \t]+(.*?)[ \t#]*$")
+# The section headings the prompt templates ask for, e.g. "## 3. ACCESSIBILITY MODIFICATION: DYSLEXIA"
+STANDARD_PROJECT_HEADING = re.compile(r"\bSTANDARD PROJECT\b", re.IGNORECASE)
+LESSON_PLAN_HEADING = re.compile(r"\bFORMAL LESSON PLAN\b", re.IGNORECASE)
+MODIFICATION_HEADING = re.compile(r"\bACCESSIBILITY MODIFICATION\s*:\s*(.+?)(?:\s+VERSION)?$", re.IGNORECASE)
+# What SectionParser._section_key returns for the heading of a modification the config did not ask for
+_UNKNOWN_MODIFICATION = (SECTION_MODIFICATION, None)
+
+@dataclass(frozen=True)
+class Subsection:
+    """A ## or ### part of a section; text starts with its heading line"""
+    level: int
+    title: str
+    text: str
+
+@dataclass(frozen=True)
+class DocumentSection:
+    """
+    One section of a parsed package. intro is the text before the first subsection (including
+    the section heading, whose text is title); text is intro followed by every subsection.
+    """
+    kind: str
+    modification: str = None
+    title: str = None
+    intro: str = ""
+    subsections: tuple = ()
+
+    @property
+    def key(self):
+        return (self.kind, self.modification)
+
+    @property
+    def label(self):
+        return section_label(self.kind, self.modification)
+
+    @property
+    def parts(self):
+        """The intro (when it has any text) and each subsection's text, in order"""
+        return ([self.intro] if self.intro.strip() else []) + [subsection.text for subsection in self.subsections]
+
+    @property
+    def text(self):
+        return "".join(self.parts).strip()
+
+@dataclass(frozen=True)
+class ProjectDocument:
+    """
+    A package parsed into sections keyed by (kind, modification). expected holds the keys the
+    config asked for, in build_section_jobs order; extra holds text that matched none of them
+    (a repeated or unrequested section), so nothing the model wrote is dropped.
+    """
+    sections: dict
+    expected: tuple = ()
+    extra: tuple = ()
+
+    def get(self, kind, modification=None):
+        return self.sections.get((kind, modification))
+
+    @property
+    def missing(self):
+        """Expected keys with no section, or an empty one"""
+        return [key for key in self.expected if key not in self.sections or not self.sections[key].text]
+
+    def missing_report(self):
+        """Labels of the missing sections, e.g. ["Lesson Plan", "Dyslexia"]"""
+        return [section_label(*key) for key in self.missing]
+
+    @property
+    def text(self):
+        """The package as one string, sections in expected order joined with SECTION_SEPARATOR"""
+        keys = [key for key in self.expected if key in self.sections]
+        keys += [key for key in self.sections if key not in keys]
+        return f"\n\n{SECTION_SEPARATOR}\n\n".join(self.sections[key].text for key in keys)
+
+class _SectionBuilder:
+    """Lines of one section as the parser receives them"""
+
+    def __init__(self, key=None):
+        self.key = key
+        self.title = None
+        self.intro = []
+        # [level, title, lines] per subsection
+        self.subsections = []
+
+    def add(self, line, heading=None):
+        if heading is not None:
+            level, title = heading
+            if self.title is None and not self.subsections and level <= 2:
+                self.title = title
+            else:
+                self.subsections.append([level, title, []])
+        (self.subsections[-1][2] if self.subsections else self.intro).append(line)
+
+    def build(self, tail=""):
+        kind, modification = self.key if self.key else (None, None)
+        subsections = tuple(Subsection(level, title, "".join(lines)) for level, title, lines in self.subsections)
+        intro = "".join(self.intro)
+        if tail:
+            if subsections:
+                last = subsections[-1]
+                subsections = subsections[:-1] + (Subsection(last.level, last.title, last.text + tail),)
+            else:
+                intro += tail
+        return DocumentSection(kind, modification, self.title, intro, subsections)
+
+class SectionParser:
+    """
+    Single-pass, incremental parser from model output to a ProjectDocument. feed() takes deltas
+    as they stream in and only looks at complete lines, each once, so parsing a package is O(n)
+    however it is chunked.
+
+    A new section starts at a SECTION_SEPARATOR or at one of the template's section headings
+    (so a missing separator does not merge two sections), and is keyed by that heading: the
+    standard project, the formal lesson plan or an accessibility modification by name. A section
+    heading for a key already seen (e.g. "## Standard Project Overview" inside the lesson plan)
+    is a subsection of the current section instead, and a heading for a modification nobody
+    asked for is kept as extra text. A part without a new section heading takes the first
+    expected key not yet seen, unless it shows that a stray separator split a section: it opens
+    with an already seen section heading, or with a ### subsection while the previous section
+    has no subsections yet or already has one of that title. Then it continues the previous
+    section. A part opened by an unrequested modification's heading takes the next expected
+    modification. With split=False all the text is one section, the first expected key; that
+    is how the output of a single section request is parsed.
+    """
+
+    def __init__(self, jobs=(), split=True):
+        self.expected = tuple(job.key for job in jobs)
+        self.split = split
+        self._modifications = {
+            modification.lower(): (kind, modification) for kind, modification in self.expected if modification
+        }
+        self._sections = {}
+        self._extra = []
+        self._last = None
+        self._current = None if split else self._open(self.expected[0] if self.expected else None)
+        # Lines of a part that has not yet shown which section it is (e.g. a preface before the first heading)
+        self._pending = [] if split else None
+        self._partial = []
+
+    def feed(self, delta):
+        if "\n" not in delta:
+            self._partial.append(delta)
+            return self
+        self._partial.append(delta)
+        lines = "".join(self._partial).split("\n")
+        self._partial = [lines.pop()]
+        for line in lines:
+            self._line(line + "\n")
+        return self
+
+    def close(self):
+        """Parse whatever is left and return the finished ProjectDocument"""
+        tail = "".join(self._partial)
+        self._partial = []
+        if tail:
+            self._line(tail)
+        self._resolve_pending()
+        return self.document()
+
+    def document(self):
+        """The document parsed so far; an unfinished last line is shown but not yet parsed"""
+        tail = "".join(self._partial) if self._pending is None else ""
+        sections = {key: builder.build(tail if builder is self._current else "")
+                    for key, builder in self._sections.items()}
+        extra = tuple(builder.build(tail if builder is self._current else "") for builder in self._extra)
+        return ProjectDocument(sections, self.expected, extra)
+
+    def section(self):
+        """The single section parsed so far, for a parser made with split=False"""
+        return self.document().sections.get(self.expected[0]) if self.expected else None
+
+    def _open(self, key):
+        builder = _SectionBuilder(key)
+        if key is None or key in self._sections:
+            self._extra.append(builder)
+        else:
+            self._sections[key] = builder
+        self._last = builder
+        return builder
+
+    def _line(self, line):
+        if self.split and SECTION_SEPARATOR in line:
+            before, _, after = line.partition(SECTION_SEPARATOR)
+            if before.strip():
+                self._line(before.rstrip() + "\n")
+            self._resolve_pending()
+            self._current = None
+            self._pending = []
+            if after.strip():
+                self._line(after.lstrip())
+            return
+        match = HEADING_PATTERN.match(line.rstrip("\r\n"))
+        heading = (len(match.group(1)), match.group(2)) if match else None
+        if self.split and heading is not None:
+            key = self._section_key(*heading)
+            if key is _UNKNOWN_MODIFICATION:
+                # The model renamed a modification when it opens a part, otherwise wrote one nobody asked for
+                self._start(self._next_expected(SECTION_MODIFICATION) if self._pending is not None else None)
+            elif key is not None and key not in self._sections:
+                self._start(key)
+            elif self._pending is not None:
+                # The first heading of a part without a new section heading decides where it belongs
+                if self._last is not None and (key is not None or self._continues_last(*heading)):
+                    self._current = self._last
+                    self._flush_pending()
+                else:
+                    self._start(self._next_expected())
+        if self._pending is not None:
+            self._pending.append(line)
+            return
+        if self._current is None:
+            self._current = self._open(self._next_expected())
+        self._current.add(line, heading)
+
+    def _start(self, key):
+        self._current = self._open(key)
+        self._flush_pending()
+
+    def _flush_pending(self):
+        pending, self._pending = self._pending or [], None
+        for line in pending:
+            self._current.add(line)
+
+    def _resolve_pending(self):
+        """A part ended before any heading: it is the next expected section"""
+        if self._pending is None:
+            return
+        if any(line.strip() for line in self._pending):
+            self._start(self._next_expected())
+        self._pending = None
+
+    def _next_expected(self, kind=None):
+        return next((key for key in self.expected if key not in self._sections and kind in (None, key[0])), None)
+
+    def _continues_last(self, level, title):
+        """
+        Whether a part opening with a heading that is not a section heading continues the previous
+        section: only a ### subsection does, when the previous section has no subsections yet or
+        already has one with this title
+        """
+        if level < 3:
+            return False
+        titles = {subsection[1].lower() for subsection in self._last.subsections}
+        return not titles or title.lower() in titles
+
+    def _section_key(self, level, title):
+        """
+        The section a # or ## heading starts, None when it is not a section heading, or
+        _UNKNOWN_MODIFICATION for a modification the config did not ask for
+        """
+        if level > 2:
+            return None
+        match = MODIFICATION_HEADING.search(title)
+        if match:
+            name = match.group(1).strip()
+            return self._modifications.get(name.lower(), _UNKNOWN_MODIFICATION)
+        if LESSON_PLAN_HEADING.search(title):
+            return (SECTION_LESSON_PLAN, None)
+        if STANDARD_PROJECT_HEADING.search(title):
+            return (SECTION_STANDARD_PROJECT, None)
+        return None
+
+def parse_package(text, jobs):
+    """Parse a whole comprehensive response into a ProjectDocument keyed by jobs"""
+    return SectionParser(jobs).feed(text).close()
+
+def parse_section(job, text):
+    """Parse the output of a single section request into a DocumentSection"""
+    return SectionParser([job], split=False).feed(text).close().sections[job.key]
+
+def section_cache_key(config, kind, modification=None):
+    """Cache key for one section, built from only the config fields that section depends on"""
+    return make_section_cache_key(MODEL, TEMPERATURE, config.section_digest(kind, modification), SECTION_CACHE_VERSION)
+
+def build_section_jobs(config):
+    """
+    Split the package into independent section jobs, in the order app.py displays them:
+    standard project, formal lesson plan, then one job per modification in canonical order
+    """
+    config = normalize_project_config(config)
+    
+    jobs = [
+        SectionJob(
+            SECTION_STANDARD_PROJECT,
+            construct_section_prompt(config, get_standard_project_section(config)),
+            cache_key=section_cache_key(config, SECTION_STANDARD_PROJECT)
+        ),
+        SectionJob(
+            SECTION_LESSON_PLAN,
+            construct_section_prompt(config, get_lesson_plan_section(config)),
+            cache_key=section_cache_key(config, SECTION_LESSON_PLAN)
+        ),
+    ]
+    for modification in config.accessibility_modifications:
+        jobs.append(SectionJob(
+            SECTION_MODIFICATION,
+            construct_section_prompt(config, get_accessibility_section(modification)),
+            modification,
+            section_cache_key(config, SECTION_MODIFICATION, modification)
+        ))
+    
+    return jobs
+
+def load_cached_sections(jobs, use_cache=True, refresh=False):
+    """Return {job index: text} for the sections that are already cached"""
+    if not use_cache or refresh:
+        return {}
+    
+    cache = get_response_cache()
+    sections = {}
+    for index, job in enumerate(jobs):
+        text = cache.get(job.cache_key)
+        if text is not None:
+            sections[index] = text
+    return sections
+
+def store_section(job, text, use_cache=True, truncated=False):
+    """
+    Cache a successfully generated section under its section key; a truncated one (still cut
+    off, see mark_truncated) only for TRUNCATED_SECTION_TTL_SECONDS
+    """
+    if use_cache and text and not text.startswith("❌"):
+        get_response_cache().set(job.cache_key, text, ttl_seconds=TRUNCATED_SECTION_TTL_SECONDS if truncated else None)
+
+def mark_truncated(text):
+    """Append TRUNCATED_NOTICE to the text of a section still cut off at its output budget"""
+    return f"{text.rstrip()}\n\n{TRUNCATED_NOTICE}"
+
+def is_truncated(text):
+    """Whether a section's text ends with TRUNCATED_NOTICE"""
+    return text.rstrip().endswith(TRUNCATED_NOTICE)
+
+def store_package_sections(jobs, document, use_cache=True, incomplete=()):
+    """
+    Cache each section of a parsed comprehensive response under its job's key, so later
+    packages that share sections reuse them. Missing sections are not cached, and the keys in
+    incomplete (sections still cut off) are cached as truncated.
+    """
+    if not use_cache:
+        return
+    for job in jobs:
+        section = document.sections.get(job.key)
+        if section is not None:
+            store_section(job, section.text, truncated=job.key in incomplete)
+
+def _section_workers(jobs, max_workers):
+    """Number of worker threads for a set of section jobs"""
+    return max(1, min(max_workers or SECTION_CONCURRENCY, len(jobs)))
+
+def generate_section(job, use_cache=True, deadline=None, trace=None):
+    """
+    Generate one section and cache it under its section key. A section cut off at its output
+    budget is continued (see continue_section); if it is still cut off it is returned with
+    TRUNCATED_NOTICE and cached as truncated.
+    """
+    with span(trace, "section", section=job.label, cache="miss") as step:
+        meta = {}
+        # Section jobs are cached by section key, so the prompt-level cache is not used for them
+        text = call_openrouter_api(job.prompt, use_cache=False, max_tokens=job.max_tokens, deadline=deadline,
+                                   trace=trace, meta=meta)
+        if text.startswith("❌"):
+            step.fail(text)
+            return text
+        finish_reason = meta.get("finish_reason")
+        if finish_reason == "length":
+            text, finish_reason = continue_section(job, text, deadline, trace)
+        step.set(finish_reason=finish_reason)
+        if finish_reason == "length":
+            text = mark_truncated(text)
+        store_section(job, text, use_cache, truncated=finish_reason == "length")
+    return text
+
+def construct_continuation_prompt(job, text):
+    """Ask for the rest of a section whose response was cut off, with its end and headings as context"""
+    section = parse_section(job, text)
+    written = ", ".join(subsection.title for subsection in section.subsections) or "only the opening"
+    return f"""{job.prompt}
+**PARTIAL RESPONSE:**
+The response to the section above was cut off before it was finished. The parts already written are: {written}.
+It ends with:
+
+{text[-REPAIR_CONTEXT_CHARS:]}
+
+Continue from exactly where it stops, mid-sentence if need be, and write the remaining parts of the section. Do not repeat anything already written and do not start the section over.
+"""
+
+def construct_fill_in_prompt(job, document):
+    """Ask for a section the package is missing, with the sections already written as context"""
+    written = "\n\n".join(section.text for section in document.sections.values())
+    return f"""{job.prompt}
+**ALREADY GENERATED:**
+The other sections of this package are already written; the start of them follows. Keep this section consistent with them (the same project, driving question and activities) and write only the section requested above.
+
+{written[:REPAIR_CONTEXT_CHARS]}
+"""
+
+def trim_overlap(text, continuation):
+    """Drop the start of continuation when it repeats the end of text, as models often do when asked to continue"""
+    window = text[-CONTINUATION_MAX_OVERLAP:]
+    for size in range(min(len(window), len(continuation)), CONTINUATION_MIN_OVERLAP - 1, -1):
+        if window.endswith(continuation[:size]):
+            return continuation[size:]
+    return continuation
+
+def continue_section(job, text, deadline=None, trace=None):
+    """
+    Finish a section cut off at its output budget with up to MAX_CONTINUATIONS continuation
+    requests, each sent with the end of the text so far. Only the missing part is generated.
+    Returns (text, finish_reason); a failed continuation leaves the text as it was.
+    """
+    finish_reason = "length"
+    for _ in range(MAX_CONTINUATIONS):
+        meta = {}
+        with span(trace, "repair", section=job.label, repair="continuation") as step:
+            continuation = call_openrouter_api(construct_continuation_prompt(job, text), use_cache=False,
+                                               max_tokens=job.max_tokens, deadline=deadline, trace=trace, meta=meta)
+            if continuation.startswith("❌"):
+                step.fail(continuation)
+                break
+        text += trim_overlap(text, continuation)
+        finish_reason = meta.get("finish_reason")
+        if finish_reason != "length":
+            break
+    return text, finish_reason
+
+def stream_continuations(job, text, deadline=None, trace=None):
+    """
+    Streaming continue_section: yields the continuations' deltas and returns the final
+    finish_reason. The start of each continuation is held back until a repeat of the text
+    before it can be trimmed. Errors end the repair without being yielded.
+    """
+    finish_reason = "length"
+    for _ in range(MAX_CONTINUATIONS):
+        meta = {}
+        step = start_span(trace, "repair", section=job.label, repair="continuation")
+        deltas = stream_openrouter_api(construct_continuation_prompt(job, text), use_cache=False,
+                                       max_tokens=job.max_tokens, deadline=deadline, trace=trace, meta=meta)
+        head = ""
+        try:
+            for delta in deltas:
+                if delta.startswith("❌"):
+                    step.fail(delta)
+                    return finish_reason
+                if head is not None:
+                    head += delta
+                    if len(head) < CONTINUATION_MAX_OVERLAP:
+                        continue
+                    delta, head = trim_overlap(text, head), None
+                text += delta
+                yield delta
+            if head:
+                delta = trim_overlap(text, head)
+                text += delta
+                yield delta
+        finally:
+            step.finish()
+            deltas.close()
+        finish_reason = meta.get("finish_reason")
+        if finish_reason != "length":
+            break
+    return finish_reason
+
+def stream_section(job, meta, deadline=None, trace=None):
+    """
+    Stream one section's deltas, continuing it (see stream_continuations) when it is cut off at
+    its output budget. meta receives the final finish_reason.
+    """
+    chunks = []
+    deltas = stream_openrouter_api(job.prompt, use_cache=False, max_tokens=job.max_tokens, deadline=deadline,
+                                   trace=trace, meta=meta)
+    try:
+        for delta in deltas:
+            chunks.append(delta)
+            yield delta
+    finally:
+        deltas.close()
+    if meta.get("finish_reason") == "length" and chunks and not chunks[-1].startswith("❌"):
+        meta["finish_reason"] = yield from stream_continuations(job, "".join(chunks), deadline, trace)
+
+def repair_package(jobs, package, finish_reason=None, deadline=None, trace=None):
+    """
+    Check a comprehensive response against the sections its config requires and repair it
+    instead of regenerating it: a response cut off at its output budget has its last section
+    continued, and each required section it lacks is generated on its own, with the sections
+    already written as context. A complete package costs no further requests.
+    Returns (document, incomplete keys, error), where error is the first failed fill-in's "❌ Error" or None
+    and incomplete holds the sections still cut off, which end with TRUNCATED_NOTICE.
+    """
+    document = parse_package(package, jobs)
+    by_key = {job.key: job for job in jobs}
+    sections = dict(document.sections)
+    incomplete = set()
+    
+    written = [key for key in sections if key in by_key]
+    if finish_reason == "length" and written:
+        last = by_key[written[-1]]
+        text, last_reason = continue_section(last, sections[last.key].text, deadline, trace)
+        if last_reason == "length":
+            text = mark_truncated(text)
+            incomplete.add(last.key)
+        sections[last.key] = parse_section(last, text)
+    
+    missing = [by_key[key] for key in document.missing]
+    error = None
+    if missing:
+        fill_ins = [replace(job, prompt=construct_fill_in_prompt(job, document)) for job in missing]
+        
+        def fill_in(job):
+            with span(trace, "repair", section=job.label, repair="fill_in"):
+                # Not cached here: store_package_sections caches the repaired package's sections
+                return generate_section(job, use_cache=False, deadline=deadline, trace=trace)
+        
+        with ThreadPoolExecutor(max_workers=_section_workers(fill_ins, None), thread_name_prefix="section") as executor:
+            for job, text in zip(fill_ins, executor.map(fill_in, fill_ins)):
+                if text.startswith("❌"):
+                    error = error or text
+                else:
+                    if is_truncated(text):
+                        incomplete.add(job.key)
+                    sections[job.key] = parse_section(job, text)
+    
+    ordered = {job.key: sections[job.key] for job in jobs if job.key in sections}
+    ordered.update((key, section) for key, section in sections.items() if key not in ordered)
+    return ProjectDocument(ordered, document.expected, document.extra), incomplete, error
+
+def trace_cached_sections(jobs, cached, trace):
+    """Record a span for each section served from the section cache"""
+    for index in cached:
+        with span(trace, "section", section=jobs[index].label, cache="hit"):
+            pass
+
+def generate_missing_sections(jobs, sections, use_cache=True, max_workers=None, deadline=None, trace=None):
+    """
+    Generate every job not already in sections ({job index: text}) concurrently, each with an
+    output budget sized for its kind. Returns all texts (or "❌ Error" strings) in job order;
+    sections still waiting for a worker when deadline passes fail without being sent.
+    """
+    missing = [index for index in range(len(jobs)) if index not in sections]
+    
+    if missing:
+        workers = _section_workers(missing, max_workers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="section") as executor:
+            texts = executor.map(
+                lambda index: generate_section(jobs[index], use_cache=use_cache, deadline=deadline, trace=trace), missing
+            )
+            sections = {**sections, **dict(zip(missing, texts))}
+    
+    return [sections[index] for index in range(len(jobs))]
+
+def plan_sections(config, use_cache=True, refresh=False, trace=None):
+    """Build a package's section jobs and look up the cached ones, timing both on trace"""
+    with span(trace, "build_prompts") as step:
+        jobs = build_section_jobs(config)
+        step.set(sections=len(jobs))
+    with span(trace, "cache_lookup") as step:
+        cached = load_cached_sections(jobs, use_cache, refresh)
+        step.set(hits=len(cached), misses=len(jobs) - len(cached))
+    trace_cached_sections(jobs, cached, trace)
+    return jobs, cached
+
+def generate_comprehensive_project(config, use_cache=True, refresh=False, fan_out=True, deadline=None, trace=None,
+                                   meta=None):
     """
     Generate a comprehensive project package with accessibility modifications
-    and formal lesson plan using OpenRouter API
+    and formal lesson plan using OpenRouter API.
+    Accepts the UI's config dict or a ProjectConfig; sections come back in canonical
+    modification order regardless of the order the modifications were selected in.
+    By default each section is generated concurrently and joined with SECTION_SEPARATOR;
+    fan_out=False sends the single comprehensive prompt instead, and then repairs the response
+    (see repair_package) rather than regenerating it. Either way, sections already
+    cached from an earlier package (for example before a modification was added) are reused
+    and only the missing ones are generated. deadline (a Deadline, or None) bounds the whole
+    package: every request made for it gives up once it passes. Timings are recorded as spans
+    on trace (a tracing.Trace, or None). meta (a dict, or None) receives "missing_sections":
+    the labels of required sections the package still lacks, taken from the per-section results.
+    """
+    
+    config = normalize_project_config(config)
+    jobs, cached = plan_sections(config, use_cache, refresh, trace)
+    if meta is None:
+        meta = {}
+    
+    if not fan_out and not cached:
+        # Construct the comprehensive prompt
+        with span(trace, "build_prompts", sections=1):
+            prompt = construct_comprehensive_prompt(config)
+        
+        # Make API call
+        response_meta = {}
+        package = call_openrouter_api(prompt, use_cache=use_cache, refresh=refresh,
+                                      max_tokens=comprehensive_output_tokens(config), deadline=deadline, trace=trace,
+                                      meta=response_meta)
+        if package.startswith("❌"):
+            return package
+        # Sections the response lacks or that were cut off are generated on their own, not the whole package again
+        document, incomplete, error = repair_package(jobs, package, response_meta.get("finish_reason"), deadline, trace)
+        store_package_sections(jobs, document, use_cache, incomplete)
+        meta["missing_sections"] = document.missing_report()
+        return error or document.text
+    
+    sections = generate_missing_sections(jobs, cached, use_cache, deadline=deadline, trace=trace)
+    
+    # Successful sections are cached, so retrying after an error only regenerates the failed ones
+    for section in sections:
+        if section.startswith("❌"):
+            return section
+    
+    meta["missing_sections"] = [job.label for job, section in zip(jobs, sections) if not section.strip()]
+    return f"\n\n{SECTION_SEPARATOR}\n\n".join(section.strip() for section in sections)
+
+def generate_comprehensive_project_stream(config, use_cache=True, refresh=False, max_workers=None, deadline=None,
+                                          trace=None):
+    """
+    Streaming variant of generate_comprehensive_project.
+    Streams every missing section concurrently and yields (section_index, delta) pairs as
+    deltas arrive, where section_index follows build_section_jobs order. Cached sections are
+    yielded first as a single delta each, and a section cut off at its output budget streams
+    its continuations as further deltas, then a TRUNCATED_NOTICE delta if it is still cut off. A failed section yields a single "❌ Error" delta;
+    the other sections keep streaming. Sections still running when deadline passes end with an error.
+    Timings are recorded as spans on trace.
     """
     
-    # Construct the comprehensive prompt
-    prompt = construct_comprehensive_prompt(config)
+    jobs, cached = plan_sections(config, use_cache, refresh, trace)
+    missing = [index for index in range(len(jobs)) if index not in cached]
+    events = queue.Queue()
+    stop = threading.Event()
     
-    # Make API call
-    result = call_openrouter_api(prompt)
+    def run(index, job):
+        chunks = []
+        failed = False
+        meta = {}
+        step = start_span(trace, "section", section=job.label, cache="miss")
+        deltas = stream_section(job, meta, deadline=deadline, trace=trace)
+        try:
+            for delta in deltas:
+                if stop.is_set():
+                    step.fail("cancelled")
+                    return
+                if delta.startswith("❌ Error"):
+                    failed = True
+                    step.fail(delta)
+                chunks.append(delta)
+                events.put((index, delta))
+            step.set(finish_reason=meta.get("finish_reason"))
+            if failed:
+                return
+            truncated = meta.get("finish_reason") == "length"
+            if truncated:
+                notice = f"\n\n{TRUNCATED_NOTICE}"
+                chunks.append(notice)
+                events.put((index, notice))
+            store_section(job, "".join(chunks), use_cache, truncated)
+        finally:
+            step.finish()
+            # Stops following the upstream stream, which is closed once no other caller reads it
+            deltas.close()
+            events.put((index, None))
     
-    return result
+    executor = ThreadPoolExecutor(max_workers=_section_workers(missing, max_workers), thread_name_prefix="section")
+    for index in missing:
+        executor.submit(run, index, jobs[index])
+    
+    remaining = len(missing)
+    try:
+        for index, text in cached.items():
+            yield index, text
+        while remaining:
+            index, delta = events.get()
+            if delta is None:
+                remaining -= 1
+                continue
+            yield index, delta
+    finally:
+        # Reached when the consumer stops early too: abandon streams that are still running
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def comprehensive_output_tokens(config):
+    """Output budget covering every section the comprehensive prompt asks for"""
+    config = normalize_project_config(config)
+    return (SECTION_OUTPUT_TOKENS[SECTION_STANDARD_PROJECT] + SECTION_OUTPUT_TOKENS[SECTION_LESSON_PLAN]
+            + SECTION_OUTPUT_TOKENS[SECTION_MODIFICATION] * len(config.accessibility_modifications))
+
+def check_token_budget(config, fan_out=True):
+    """
+    Check a package against the model's context window before generating it.
+    Returns warnings for sections whose output budget had to be reduced (they may be cut short)
+    and raises TokenBudgetError when a request cannot be sent at all.
+    """
+    config = normalize_project_config(config)
+    
+    if fan_out:
+        requests_to_send = [(job.label, job.prompt, job.max_tokens) for job in build_section_jobs(config)]
+    else:
+        requests_to_send = [("Project package", construct_comprehensive_prompt(config), comprehensive_output_tokens(config))]
+    
+    warnings = []
+    for label, prompt, max_tokens in requests_to_send:
+        budget = plan_budget(build_messages(prompt), max_tokens, MODEL)
+        if not budget.fits:
+            warnings.append(
+                f"{label}: only {budget.max_tokens} of {budget.requested_output_tokens} output tokens fit "
+                f"in the model's context, so this section may be cut short."
+            )
+    return warnings
 
 def construct_comprehensive_prompt(config):
     """
     Construct a detailed prompt for generating comprehensive educational content
     """
     
-    environment_context = get_environment_context(config['environment'])
+    config = normalize_project_config(config)
+    
+    base_prompt = f"""{get_project_specifications(config)}
+**REQUIRED OUTPUT SECTIONS:**
+
+{get_standard_project_section(config)}
+
+---SECTION_SEPARATOR---
+
+{get_lesson_plan_section(config)}
+
+{generate_accessibility_sections(config.accessibility_modifications)}
+"""
+
+    return base_prompt
+
+def construct_section_prompt(config, section_template):
+    """
+    Construct a prompt that asks for a single section of the project package
+    """
+    
+    config = normalize_project_config(config)
+    
+    return f"""{get_project_specifications(config)}
+**REQUIRED OUTPUT SECTION:**
+Generate only the section below, in full. Do not write any other sections and do not include section separators.
+
+{section_template}
+"""
+
+def get_project_specifications(config):
+    """Introduction, project specifications and environment context shared by every prompt"""
+    environment_context = get_environment_context(config.environment)
     
-    base_prompt = f"""
+    return f"""
 You are an expert educational curriculum designer and special education specialist. Generate a complete, comprehensive, grade-appropriate, and engaging educational project package with the following specifications:
 
 **PROJECT SPECIFICATIONS:**
-- State: {config['state']}
-- Content Area: {config['content_area']} 
-- Grade Level: {config['grade']}
-- Standard: {config['standard']} - {config['standard_title']}
-- Sub-Standard: {config['sub_standard']} - {config['sub_standard_description']}
-- Group Configuration: {config['group_size']}
-- Learning Environment: {config['environment']}
-- Time Allotment: {config['time_allotment']}
+- State: {config.state}
+- Content Area: {config.content_area} 
+- Grade Level: {config.grade}
+- Standard: {config.standard} - {config.standard_title}
+- Sub-Standard: {config.sub_standard} - {config.sub_standard_description}
+- Group Configuration: {config.group_size}
+- Learning Environment: {config.environment}
+- Time Allotment: {config.time_allotment}
 
 {environment_context}
+"""
 
-**REQUIRED OUTPUT SECTIONS:**
-
-## 1. STANDARD PROJECT VERSION
+def get_standard_project_section(config):
+    """Output instructions for the standard project version"""
+    return f"""## 1. STANDARD PROJECT VERSION
 
 ### Project Title
 Create an engaging, grade-appropriate title that captures the essence of the learning objectives.
@@ -56,10 +883,10 @@ Develop a compelling essential question that guides student inquiry and connects
 - Real-world connections and relevance
 
 ### Materials & Resources List
-{get_materials_section(config['environment'])}
+{get_materials_section(config.environment)}
 
 ### Implementation Timeline
-Break down the project into phases across the {config['time_allotment']} timeframe:
+Break down the project into phases across the {config.time_allotment} timeframe:
 - Phase breakdown with specific activities
 - Milestones and checkpoints
 - Assessment touchpoints
@@ -68,33 +895,33 @@ Break down the project into phases across the {config['time_allotment']} timefra
 Step-by-step instructions for:
 - Project introduction and setup
 - Core learning activities
-- {get_group_instructions(config['group_size'])}
+- {get_group_instructions(config.group_size)}
 - Culminating activities
 
 ### Assessment & Rubric
 Create a detailed 4-category rubric aligned to the standard:
 - Content Knowledge & Understanding
 - Application of Skills
-- {get_group_assessment(config['group_size'])}
+- {get_group_assessment(config.group_size)}
 - Communication & Presentation
 
 ### Post-Project Comprehension Questions
-5-7 thought-provoking questions that assess understanding and encourage reflection.
-
----SECTION_SEPARATOR---
+5-7 thought-provoking questions that assess understanding and encourage reflection."""
 
-## 2. FORMAL LESSON PLAN FOR ADMINISTRATIVE SUBMISSION
+def get_lesson_plan_section(config):
+    """Output instructions for the formal lesson plan"""
+    return f"""## 2. FORMAL LESSON PLAN FOR ADMINISTRATIVE SUBMISSION
 
 ### Lesson Plan Header
 - Teacher: [Teacher Name]
-- Subject: {config['content_area']}
-- Grade Level: {config['grade']}
-- Duration: {config['time_allotment']}
+- Subject: {config.content_area}
+- Grade Level: {config.grade}
+- Duration: {config.time_allotment}
 - Date: [Date]
 
 ### Standards Alignment
-- Primary Standard: {config['standard']} - {config['standard_title']}
-- Sub-Standard: {config['sub_standard']} - {config['sub_standard_description']}
+- Primary Standard: {config.standard} - {config.standard_title}
+- Sub-Standard: {config.sub_standard} - {config.sub_standard_description}
 - Cross-curricular connections (if applicable)
 
 ### Learning Objectives
@@ -116,16 +943,16 @@ Students will be able to:
 - Safety considerations (if applicable)
 
 ### Instructional Sequence
-**Opening/Hook** ({get_time_breakdown(config['time_allotment'], 'opening')})
+**Opening/Hook** ({get_time_breakdown(config.time_allotment, 'opening')})
 - Engagement strategy
 - Prior knowledge activation
 
-**Development/Exploration** ({get_time_breakdown(config['time_allotment'], 'main')})
+**Development/Exploration** ({get_time_breakdown(config.time_allotment, 'main')})
 - Core learning activities
 - Guided practice opportunities
 - Independent/group work time
 
-**Closure/Reflection** ({get_time_breakdown(config['time_allotment'], 'closure')})
+**Closure/Reflection** ({get_time_breakdown(config.time_allotment, 'closure')})
 - Summary and reflection activities
 - Preview of next steps
 
@@ -141,12 +968,7 @@ Students will be able to:
 ### Administrative Notes
 - Professional development connections
 - Curriculum mapping alignment
-- Data collection points for school improvement
-
-{generate_accessibility_sections(config['accessibility_modifications'])}
-"""
-
-    return base_prompt
+- Data collection points for school improvement"""
 
 def get_environment_context(environment):
     """Generate environment-specific context for project generation"""
@@ -238,7 +1060,14 @@ def generate_accessibility_sections(modifications):
         sections.append(f"""
 ---SECTION_SEPARATOR---
 
-## 3. ACCESSIBILITY MODIFICATION: {modification.upper()}
+{get_accessibility_section(modification)}
+""")
+    
+    return "\n".join(sections)
+
+def get_accessibility_section(modification):
+    """Output instructions for a single accessibility modification version"""
+    return f"""## 3. ACCESSIBILITY MODIFICATION: {modification.upper()}
 
 ### Modified Project Overview
 - Adaptation rationale and educational philosophy
@@ -272,44 +1101,761 @@ def generate_accessibility_sections(modifications):
 - Preparation requirements
 - Classroom environment modifications
 - Peer support strategies
-- Crisis or challenge response protocols
-""")
-    
-    return "\n".join(sections)
+- Crisis or challenge response protocols"""
 
-def call_openrouter_api(prompt):
-    """Make API call to OpenRouter"""
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
+def build_messages(prompt):
+    """Build the chat messages sent for a prompt"""
+    return [
+        {
+            "role": "system", 
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user", 
+            "content": prompt
+        }
+    ]
 
+def build_request_body(prompt, stream=False, max_tokens=None):
+    """Build the chat-completions JSON body for a prompt"""
     body = {
-        "model": "mistralai/mistral-7b-instruct",
-        "messages": [
-            {
-                "role": "system", 
-                "content": "You are an expert educational curriculum designer, special education specialist, and lesson planning professional. You create comprehensive, standards-aligned educational materials that are engaging, grade-appropriate, rigorous, and accessible. Your responses are detailed, practical, and ready for immediate classroom implementation."
-            },
-            {
-                "role": "user", 
-                "content": prompt
-            }
-        ],
-        "max_tokens": 4000,
-        "temperature": 0.7
+        "model": MODEL,
+        "messages": build_messages(prompt),
+        "max_tokens": max_tokens or MAX_TOKENS,
+        "temperature": TEMPERATURE
     }
+    if stream:
+        body["stream"] = True
+
+    return body
+
+def request_cache_key(body):
+    """Cache key for a request body; streaming and non-streaming requests share entries"""
+    return make_cache_key(body["model"], body["temperature"], body["max_tokens"], body["messages"])
+
+class UsageTotals:
+    """Thread-safe running totals of requests and tokens reported by responses"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usage = {
+            "requests": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "estimated_prompt_tokens": 0, "reported_prompt_tokens": 0, "truncated": 0,
+            "cancelled": 0, "cancelled_tokens": 0,
+        }
+
+    def record(self, usage, estimated_prompt_tokens=None, finish_reason=None):
+        """
+        Add a response's usage block to the running token totals.
+        When the response reports prompt tokens, the local estimate is recorded next to them
+        so estimate_accuracy() can compare the two; finish_reason "length" counts as truncated.
+        """
+        usage = usage or {}
+        with self._lock:
+            self._usage["requests"] += 1
+            self._usage["prompt_tokens"] += usage.get("prompt_tokens") or 0
+            self._usage["completion_tokens"] += usage.get("completion_tokens") or 0
+            if estimated_prompt_tokens is not None and usage.get("prompt_tokens"):
+                self._usage["estimated_prompt_tokens"] += estimated_prompt_tokens
+                self._usage["reported_prompt_tokens"] += usage["prompt_tokens"]
+            if finish_reason == "length":
+                self._usage["truncated"] += 1
+
+    def record_cancelled(self, completion_tokens):
+        """Count a stream closed before it finished and the (estimated) tokens it had produced"""
+        with self._lock:
+            self._usage["cancelled"] += 1
+            self._usage["cancelled_tokens"] += completion_tokens
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._usage)
+
+    def estimate_accuracy(self):
+        """
+        Ratio of reported to estimated prompt tokens over requests that reported usage
+        (above 1.0 means the estimator undercounts), or None before any such request
+        """
+        with self._lock:
+            if not self._usage["estimated_prompt_tokens"]:
+                return None
+            return self._usage["reported_prompt_tokens"] / self._usage["estimated_prompt_tokens"]
+
+class ModelClient:
+    """
+    Reusable OpenRouter client.
+    Keeps a pooled keep-alive session so repeated calls skip the TCP+TLS handshake, retries
+    429/5xx responses and connection failures with exponential backoff (honoring Retry-After),
+    and uses separate connect and read timeouts. The read timeout bounds the silence between
+    bytes, not the total duration of a generation.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, base_url=OPENROUTER_BASE_URL, api_key=None, pool_size=POOL_SIZE,
+                 max_retries=MAX_RETRIES, backoff_base=1.0, backoff_max=30.0,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = (connect_timeout, read_timeout)
+        self.usage = UsageTotals()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key if api_key is not None else API_KEY}",
+            "Content-Type": "application/json"
+        })
+
+    @property
+    def completions_url(self):
+        return f"{self.base_url}/chat/completions"
+
+    def warm_up(self, connections=1):
+        """
+        Open pooled connections ahead of the first generation.
+        Failures are ignored; the first real request simply pays the handshake instead.
+        """
+        def touch():
+            try:
+                self.session.head(self.base_url, timeout=self.timeout).close()
+            except requests.exceptions.RequestException:
+                pass
+
+        threads = [threading.Thread(target=touch, daemon=True) for _ in range(max(1, connections))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def record_usage(self, usage, estimated_prompt_tokens=None, finish_reason=None):
+        """Add a response's usage block to the running token totals (see UsageTotals.record)"""
+        self.usage.record(usage, estimated_prompt_tokens, finish_reason)
+
+    def record_cancelled(self, completion_tokens):
+        """See UsageTotals.record_cancelled"""
+        self.usage.record_cancelled(completion_tokens)
+
+    def usage_totals(self):
+        """Return a snapshot of completed requests and tokens used by this client"""
+        return self.usage.snapshot()
+
+    def estimate_accuracy(self):
+        """See UsageTotals.estimate_accuracy"""
+        return self.usage.estimate_accuracy()
+
+    def _backoff_delay(self, attempt):
+        """Exponential backoff with jitter for the given zero-based attempt"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _retry_after_delay(self, response):
+        """Delay requested by a Retry-After header (seconds or HTTP date), if any"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(self.backoff_max, max(0.0, delay))
+
+    def post(self, body, stream=False, deadline=None):
+        """
+        POST a chat-completions body and return the response.
+        Retryable statuses are retried up to max_retries times; the last response is returned
+        whatever its status. Connection failures are retried, read timeouts are not because
+        the upstream may already be generating (and billing) the completion. Timeouts and
+        retry waits are cut short by deadline; no retry is made that could not finish in time.
+        """
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            timeout = tuple(cap(deadline, seconds) for seconds in self.timeout)
+            try:
+                response = self.session.post(self.completions_url, json=body, stream=stream, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout):
+                delay = self._backoff_delay(attempt)
+                if last_attempt or (deadline is not None and delay >= deadline.remaining()):
+                    raise
+            else:
+                if response.status_code not in self.RETRY_STATUSES or last_attempt:
+                    return response
+                delay = self._retry_after_delay(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                if deadline is not None and delay >= deadline.remaining():
+                    return response
+                response.close()
+            time.sleep(delay)
+
+class ModelBackend:
+    """One credential + endpoint in a BackendPool, with its health and request metrics"""
+
+    def __init__(self, name, client, weight=1.0, model=None):
+        self.name = name
+        self.client = client
+        self.weight = max(float(weight), 0.01)
+        # Model name to send instead of the requested one (e.g. for a local OpenAI-compatible server)
+        self.model = model
+        self.outstanding = 0
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.current_weight = 0.0
+        self.metrics = {"requests": 0, "failures": 0, "rate_limited": 0, "latency_seconds": 0.0}
+
+class _TrackedResponse:
+    """Response proxy that releases its backend's outstanding slot when closed"""
+
+    def __init__(self, response, backend, release):
+        self._response = response
+        self._release = release
+        self.backend = backend
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    def close(self):
+        release, self._release = self._release, None
+        try:
+            self._response.close()
+        finally:
+            if release is not None:
+                release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class BackendPool:
+    """
+    Spreads requests over several API keys and OpenAI-compatible endpoints.
+    Backends are picked by least outstanding requests relative to weight, or by smooth weighted
+    round-robin. A backend that fails to connect or answers 401/403/429/5xx is taken out of
+    rotation for a cooldown (Retry-After when given, otherwise growing with consecutive
+    failures) and the request moves to the next backend; when every backend is cooling down
+    the request waits for the first to come back. Exposes the same post/usage/warm_up
+    interface as ModelClient.
+    """
+
+    STRATEGIES = ("least_outstanding", "weighted_round_robin")
+    UNHEALTHY_STATUSES = frozenset({401, 403}) | ModelClient.RETRY_STATUSES
+
+    def __init__(self, backends, strategy="least_outstanding", max_retries=MAX_RETRIES,
+                 cooldown_base=5.0, cooldown_max=120.0):
+        if not backends:
+            raise ValueError("BackendPool needs at least one backend")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown backend strategy: {strategy!r}")
+        self.backends = list(backends)
+        self.strategy = strategy
+        self.max_retries = max_retries
+        self.cooldown_base = cooldown_base
+        self.cooldown_max = cooldown_max
+        self.usage = UsageTotals()
+        self._lock = threading.Lock()
+
+    def record_usage(self, usage, estimated_prompt_tokens=None, finish_reason=None):
+        """Add a response's usage block to the pool-wide totals (see UsageTotals.record)"""
+        self.usage.record(usage, estimated_prompt_tokens, finish_reason)
+
+    def record_cancelled(self, completion_tokens):
+        """See UsageTotals.record_cancelled"""
+        self.usage.record_cancelled(completion_tokens)
+
+    def usage_totals(self):
+        """Return a snapshot of completed requests and tokens used across all backends"""
+        return self.usage.snapshot()
+
+    def estimate_accuracy(self):
+        """See UsageTotals.estimate_accuracy"""
+        return self.usage.estimate_accuracy()
+
+    def warm_up(self, connections=1):
+        """Open pooled connections to every backend"""
+        for backend in self.backends:
+            backend.client.warm_up(connections)
+
+    def _select(self, exclude):
+        """Pick the next backend, preferring healthy ones not already tried for this request"""
+        now = time.monotonic()
+        candidates = [b for b in self.backends if b not in exclude] or self.backends
+        healthy = [b for b in candidates if b.cooldown_until <= now]
+        if not healthy:
+            # A backend already tried that has recovered beats one still cooling down
+            healthy = [b for b in self.backends if b.cooldown_until <= now]
+        if not healthy:
+            # Everything is cooling down: send to whichever comes back first rather than fail
+            return min(candidates, key=lambda b: b.cooldown_until)
+        if self.strategy == "weighted_round_robin":
+            # Smooth weighted round-robin: heavier backends are picked proportionally more often
+            total = sum(b.weight for b in healthy)
+            for b in healthy:
+                b.current_weight += b.weight
+            chosen = max(healthy, key=lambda b: b.current_weight)
+            chosen.current_weight -= total
+            return chosen
+        return min(healthy, key=lambda b: ((b.outstanding + 1) / b.weight, b.metrics["requests"]))
+
+    def _mark_failure(self, backend, response=None):
+        """Take a backend out of rotation for a cooldown; call with the lock held"""
+        backend.consecutive_failures += 1
+        backend.metrics["failures"] += 1
+        delay = None
+        if response is not None:
+            if response.status_code == 429:
+                backend.metrics["rate_limited"] += 1
+            delay = backend.client._retry_after_delay(response)
+        if delay is None:
+            delay = self.cooldown_base * (2 ** (backend.consecutive_failures - 1))
+        backend.cooldown_until = time.monotonic() + min(self.cooldown_max, delay)
+
+    def _cooldown_wait(self):
+        """Seconds until the first backend comes out of its cooldown (0 when one is healthy now)"""
+        with self._lock:
+            return max(0.0, min(b.cooldown_until for b in self.backends) - time.monotonic())
+
+    def _release(self, backend):
+        with self._lock:
+            backend.outstanding -= 1
+
+    def post(self, body, stream=False, deadline=None):
+        """
+        POST a chat-completions body to the selected backend and return its response.
+        Unhealthy responses and connection failures move on to another backend; the last
+        response is returned whatever its status. When every backend is cooling down the request
+        first waits for the earliest to come back (honouring Retry-After), and a retry that could
+        not be sent before deadline returns the response it has instead. Read timeouts are not
+        retried, as in ModelClient, and no backend is tried once deadline has passed.
+        """
+        attempts = max(len(self.backends), self.max_retries + 1)
+        tried = set()
+        wait = self._cooldown_wait()
+        if wait:
+            time.sleep(cap(deadline, wait))
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1 or (deadline is not None and deadline.expired)
+            with self._lock:
+                backend = self._select(tried)
+                tried.add(backend)
+                if len(tried) == len(self.backends):
+                    tried.clear()
+                backend.outstanding += 1
+
+            request_body = dict(body, model=backend.model) if backend.model else body
+            started = time.monotonic()
+            try:
+                response = backend.client.post(request_body, stream=stream, deadline=deadline)
+            except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout):
+                with self._lock:
+                    backend.outstanding -= 1
+                    backend.metrics["requests"] += 1
+                    self._mark_failure(backend)
+                wait = self._cooldown_wait()
+                if last_attempt or (deadline is not None and wait >= deadline.remaining()):
+                    raise
+                time.sleep(wait)
+                continue
+            except Exception:
+                self._release(backend)
+                raise
+
+            with self._lock:
+                backend.metrics["requests"] += 1
+                backend.metrics["latency_seconds"] += time.monotonic() - started
+                if response.status_code in self.UNHEALTHY_STATUSES:
+                    self._mark_failure(backend, response)
+                    retry = not last_attempt
+                else:
+                    backend.consecutive_failures = 0
+                    retry = False
+            if retry:
+                wait = self._cooldown_wait()
+                # No backend comes back in time: this response is the answer
+                retry = deadline is None or wait < deadline.remaining()
+            if retry:
+                response.close()
+                self._release(backend)
+                time.sleep(wait)
+                continue
+            return _TrackedResponse(response, backend, lambda backend=backend: self._release(backend))
+
+    def backend_stats(self):
+        """Per-backend metrics: weight, in-flight requests, totals, mean latency and cooldown"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": b.name,
+                    "base_url": b.client.base_url,
+                    "weight": b.weight,
+                    "outstanding": b.outstanding,
+                    "requests": b.metrics["requests"],
+                    "failures": b.metrics["failures"],
+                    "rate_limited": b.metrics["rate_limited"],
+                    "mean_latency_seconds": b.metrics["latency_seconds"] / b.metrics["requests"] if b.metrics["requests"] else 0.0,
+                    "cooldown_seconds": max(0.0, b.cooldown_until - now),
+                }
+                for b in self.backends
+            ]
+
+def load_backends():
+    """
+    Build ModelBackends from the environment, in order of precedence:
+    MODEL_BACKENDS, a JSON list of {"name", "base_url", "api_key" or "api_key_env", "weight", "model"};
+    OPENROUTER_API_KEYS, comma-separated keys for OPENROUTER_BASE_URL; or OPENROUTER_API_KEY alone.
+    """
+    configured = json.loads(os.getenv("MODEL_BACKENDS", "[]"))
+    if not configured:
+        keys = [key.strip() for key in os.getenv("OPENROUTER_API_KEYS", "").split(",") if key.strip()]
+        configured = [{"name": f"openrouter-{i + 1}", "api_key": key} for i, key in enumerate(keys)]
+    if not configured:
+        configured = [{"name": "openrouter", "api_key": API_KEY}]
+
+    # With several backends the pool fails over instead of retrying the same backend
+    client_retries = MAX_RETRIES if len(configured) == 1 else 0
+    backends = []
+    for i, entry in enumerate(configured):
+        api_key = entry.get("api_key")
+        if api_key is None and entry.get("api_key_env"):
+            api_key = os.getenv(entry["api_key_env"])
+        client = ModelClient(
+            base_url=entry.get("base_url", OPENROUTER_BASE_URL),
+            api_key=api_key if api_key is not None else "",
+            max_retries=client_retries,
+        )
+        backends.append(ModelBackend(entry.get("name", f"backend-{i + 1}"), client, entry.get("weight", 1.0), entry.get("model")))
+    return backends
+
+_model_client = None
+_model_client_lock = threading.Lock()
+
+def get_model_client():
+    """
+    Return the process-wide BackendPool over the configured backends (see load_backends),
+    balanced by MODEL_BACKEND_STRATEGY (least_outstanding or weighted_round_robin)
+    """
+    global _model_client
+    if _model_client is None:
+        with _model_client_lock:
+            if _model_client is None:
+                backends = load_backends()
+                _model_client = BackendPool(
+                    backends,
+                    strategy=os.getenv("MODEL_BACKEND_STRATEGY", "least_outstanding"),
+                    # A single backend's ModelClient already retries with backoff
+                    max_retries=MAX_RETRIES if len(backends) > 1 else 0,
+                )
+    return _model_client
+
+def plan_request(prompt, stream=False, max_tokens=None):
+    """
+    Build the request body for a prompt with max_tokens sized to fit the model's context.
+    Returns (body, budget); raises TokenBudgetError when the prompt leaves no room for output.
+    """
+    messages = build_messages(prompt)
+    budget = plan_budget(messages, max_tokens or MAX_TOKENS, MODEL)
+    return build_request_body(prompt, stream=stream, max_tokens=budget.max_tokens), budget
+
+def call_openrouter_api(prompt, use_cache=True, refresh=False, max_tokens=None, deadline=None, trace=None, meta=None):
+    """
+    Make API call to OpenRouter.
+    Successful responses are stored in the shared response cache; refresh skips the
+    lookup but still stores the new result, and use_cache=False bypasses the cache entirely.
+    max_tokens is the output budget the prompt needs (MAX_TOKENS by default); it is reduced
+    to what fits in the model's context, and prompts that do not fit are refused unsent.
+    The call gives up with DEADLINE_ERROR once deadline (a Deadline, or None) has passed,
+    or with CANCELLED_ERROR once it is cancelled. Queueing and request timings are recorded
+    as spans on trace (a tracing.Trace, or None). When meta is a dict it receives the response's
+    "usage" and "finish_reason", also when the response came from a shared in-flight request;
+    it stays empty for cache hits, which are never cut off.
+    Responses cut off at max_tokens (finish_reason "length") are not cached.
+    """
+    try:
+        body, budget = plan_request(prompt, max_tokens=max_tokens)
+    except TokenBudgetError as e:
+        return f"❌ Error: {str(e)}"
+
+    cache = get_response_cache() if use_cache else None
+    cache_key = request_cache_key(body)
+    if cache is not None and not refresh:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # Identical requests already in flight, in this or another worker process, share one upstream call,
+    # which runs until every caller has stopped waiting rather than until this caller's deadline.
+    # A slow or failing primary model is hedged with the next model in MODEL_CHAIN.
+    def produce(flight_deadline, flight_meta):
+        attempts = _hedged_attempts(
+            lambda model, attempt_meta: iter((_request_completion(dict(body, model=model), budget, flight_deadline,
+                                                                  trace, attempt_meta),)),
+            COMPLETE, flight_meta,
+        )
+        return _cache_when_complete(attempts, cache, cache_key, flight_meta)
 
     try:
-        response = requests.post(url, headers=headers, json=body, timeout=60)
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
+        return get_single_flight().call(cache_key, produce, deadline, meta)
+    except DeadlineExceeded:
+        return deadline_error(deadline)
+
+def _hedged_attempts(start_attempt, kind, meta):
+    """
+    hedged() over MODEL_CHAIN, where start_attempt(model, attempt_meta) fills a dict of its own.
+    Only the winning attempt's "usage" and "finish_reason" are copied into meta, so a losing
+    attempt that finishes late cannot overwrite them.
+    """
+    metas = {}
+
+    def start(model):
+        metas[model] = {}
+        return start_attempt(model, metas[model])
+
+    winner = yield from hedged(start, MODEL_CHAIN, get_hedge_policy(), kind=kind)
+    if winner is not None:
+        meta.update(metas[winner])
+
+def _cache_when_complete(chunks, cache, cache_key, meta=None):
+    """Pass chunks through, caching the joined text once they end without an error chunk or being cut off"""
+    received = []
+    for chunk in chunks:
+        received.append(chunk)
+        yield chunk
+    if meta is not None and meta.get("finish_reason") == "length":
+        return
+    if cache is not None and received and not any(chunk.startswith("❌") for chunk in received):
+        cache.set(cache_key, "".join(received))
+
+def deadline_error(deadline):
+    """Error for a request stopped by its deadline: cancelled, or out of time"""
+    return CANCELLED_ERROR if deadline is not None and deadline.cancelled else DEADLINE_ERROR
+
+def circuit_open_error(retry_after):
+    """Error shown while a model's circuit breaker is refusing requests"""
+    seconds = max(1, round(retry_after))
+    return (f"❌ Error: The AI service is not responding reliably right now, so new requests are paused. "
+            f"Please try again in about {seconds} second{'s' if seconds != 1 else ''}.")
+
+def model_unavailable_error():
+    """Return circuit_open_error when every model in MODEL_CHAIN is refusing requests, otherwise None"""
+    waits = [get_circuit_breaker(route.model).retry_after() for route in MODEL_CHAIN]
+    if all(waits):
+        return circuit_open_error(min(waits))
+    return None
+
+def _limiter_permit(body, budget, deadline):
+    """Wait (no longer than deadline allows) for the rate limiter to admit a request"""
+    limiter = get_rate_limiter(body["model"])
+    return limiter.acquire(budget.prompt_tokens + body["max_tokens"], max_wait=cap(deadline, limiter.max_wait))
+
+def _request_completion(body, budget, deadline=None, trace=None, meta=None):
+    """Send one non-streaming request; returns the content or an "❌ Error" string"""
+    client = get_model_client()
+    model = body["model"]
+    step = start_span(trace, "queue", model=model)
+    error = None
+    try:
+        # An open breaker refuses before the request waits in the rate limiter queue
+        with get_circuit_breaker(model).attempt() as attempt:
+            with _limiter_permit(body, budget, deadline) as permit:
+                step.finish()
+                step = start_span(trace, "request", model=model)
+                try:
+                    with client.post(body, deadline=deadline) as response:
+                        if response.status_code == 200:
+                            data = response.json()
+                            choice = data["choices"][0]
+                            usage = data.get("usage") or {}
+                            client.record_usage(usage, budget.prompt_tokens, choice.get("finish_reason"))
+                            permit.settle(usage)
+                            attempt.succeeded()
+                            step.set(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+                                     finish_reason=choice.get("finish_reason"))
+                            if meta is not None:
+                                meta.update(usage=usage, finish_reason=choice.get("finish_reason"))
+                            return choice["message"]["content"]
+                        else:
+                            if response.status_code in ModelClient.RETRY_STATUSES:
+                                attempt.failed()
+                            error = f"❌ Error: {response.status_code} — {response.text}"
+                            return error
+                except requests.exceptions.RequestException:
+                    # A timeout cut short by our own deadline says nothing about the upstream's health
+                    if deadline is None or not deadline.expired:
+                        attempt.failed()
+                    raise
+    except CircuitOpenError as e:
+        error = circuit_open_error(e.retry_after)
+    except DeadlineExceeded:
+        error = deadline_error(deadline)
+    except RateLimitTimeout:
+        error = deadline_error(deadline) if deadline is not None and deadline.expired else RATE_LIMIT_ERROR
+    except requests.exceptions.Timeout:
+        if deadline is not None and deadline.expired:
+            error = deadline_error(deadline)
         else:
-            return f"❌ Error: {response.status_code} — {response.text}"
+            error = "❌ Error: Request timed out. Please try again."
+    except requests.exceptions.RequestException as e:
+        error = f"❌ Error: Network error occurred - {str(e)}"
+    except Exception as e:
+        error = f"❌ Error: Unexpected error occurred - {str(e)}"
+    finally:
+        if error:
+            step.fail(error)
+        step.finish()
+    return error
+
+class StreamError(Exception):
+    """Error event reported by the upstream inside an otherwise successful stream"""
+
+def iter_sse_deltas(response, meta=None):
+    """
+    Yield content deltas from an OpenRouter server-sent event stream.
+    Lines are decoded as UTF-8 explicitly because event streams rarely declare a charset.
+    When meta is a dict it receives the stream's "usage" and "finish_reason".
+    """
+    for raw_line in response.iter_lines():
+        if not raw_line:
+            continue
+        line = raw_line.decode("utf-8")
+        # Comment lines (": OPENROUTER PROCESSING") are keep-alives
+        if line.startswith(":") or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        event = json.loads(data)
+        if "error" in event:
+            error = event["error"]
+            message = error.get("message", error) if isinstance(error, dict) else error
+            raise StreamError(str(message))
+        if meta is not None and event.get("usage"):
+            meta["usage"] = event["usage"]
+        for choice in event.get("choices", []):
+            if meta is not None and choice.get("finish_reason"):
+                meta["finish_reason"] = choice["finish_reason"]
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+def stream_openrouter_api(prompt, use_cache=True, refresh=False, max_tokens=None, deadline=None, trace=None, meta=None):
+    """
+    Stream a completion from OpenRouter, yielding content deltas as they arrive.
+    Errors are yielded as a final chunk starting with "❌ Error", matching call_openrouter_api.
+    The read timeout applies to the gap between chunks, so long generations that keep
+    making progress are never cut off unless deadline passes; cache hits are yielded as a single chunk.
+    Queueing, connect, time-to-first-token and streaming are recorded as spans on trace.
+    meta receives "usage" and "finish_reason" as for call_openrouter_api.
+    """
+    try:
+        body, budget = plan_request(prompt, stream=True, max_tokens=max_tokens)
+    except TokenBudgetError as e:
+        yield f"❌ Error: {str(e)}"
+        return
+
+    cache = get_response_cache() if use_cache else None
+    cache_key = request_cache_key(body)
+    if cache is not None and not refresh:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    # Followers of an identical in-flight request receive the leader's deltas as they arrive; the
+    # upstream stream stops once every caller has stopped reading, not when this caller's deadline passes.
+    # A primary model that is slow to its first delta is hedged with the next model in MODEL_CHAIN.
+    def produce(flight_deadline, flight_meta):
+        attempts = _hedged_attempts(
+            lambda model, attempt_meta: _stream_completion(dict(body, model=model), budget, flight_deadline, trace,
+                                                           attempt_meta),
+            STREAM, flight_meta,
+        )
+        return _cache_when_complete(attempts, cache, cache_key, flight_meta)
+
+    try:
+        yield from get_single_flight().stream(cache_key, produce, deadline, meta)
+    except DeadlineExceeded:
+        yield deadline_error(deadline)
+
+def _stream_completion(body, budget, deadline=None, trace=None, meta=None):
+    """Send one streaming request, yielding deltas and then a final "❌ Error" chunk on failure"""
+    client = get_model_client()
+    model = body["model"]
+    meta = {} if meta is None else meta
+    received = []
+    step = start_span(trace, "queue", model=model)
+    error = None
+    try:
+        with get_circuit_breaker(model).attempt() as attempt:
+            # The concurrency slot is held until the stream is closed, not just until headers arrive
+            with _limiter_permit(body, budget, deadline) as permit:
+                step.finish()
+                step = start_span(trace, "connect", model=model)
+                try:
+                    with client.post(body, stream=True, deadline=deadline) as response:
+                        if response.status_code != 200:
+                            if response.status_code in ModelClient.RETRY_STATUSES:
+                                attempt.failed()
+                            error = f"❌ Error: {response.status_code} — {response.text}"
+                            yield error
+                            return
+                        step.finish()
+                        step = start_span(trace, "first_token", model=model)
+                        for delta in iter_sse_deltas(response, meta):
+                            if deadline is not None:
+                                deadline.check()
+                            if not received:
+                                step.finish()
+                                step = start_span(trace, "stream", model=model)
+                            received.append(delta)
+                            yield delta
+                        usage = meta.get("usage") or {}
+                        step.set(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+                                 finish_reason=meta.get("finish_reason"))
+                except (requests.exceptions.RequestException, StreamError):
+                    if deadline is None or not deadline.expired:
+                        attempt.failed()
+                    raise
+                permit.settle(meta.get("usage"))
+            attempt.succeeded()
+        client.record_usage(meta.get("usage"), budget.prompt_tokens, meta.get("finish_reason"))
+    except GeneratorExit:
+        # Closed by the reader (cancelled, abandoned or a lost hedge): the socket is already closed
+        if received:
+            client.record_cancelled(estimate_tokens("".join(received)))
+        step.fail("cancelled")
+        raise
+    except CircuitOpenError as e:
+        error = circuit_open_error(e.retry_after)
+    except DeadlineExceeded:
+        if received:
+            client.record_cancelled(estimate_tokens("".join(received)))
+        error = deadline_error(deadline)
+    except RateLimitTimeout:
+        error = deadline_error(deadline) if deadline is not None and deadline.expired else RATE_LIMIT_ERROR
     except requests.exceptions.Timeout:
-        return "❌ Error: Request timed out. Please try again."
+        if deadline is not None and deadline.expired:
+            error = deadline_error(deadline)
+        else:
+            error = "❌ Error: The model stopped responding. Please try again."
     except requests.exceptions.RequestException as e:
-        return f"❌ Error: Network error occurred - {str(e)}"
+        error = f"❌ Error: Network error occurred - {str(e)}"
+    except StreamError as e:
+        error = f"❌ Error: {str(e)}"
     except Exception as e:
-        return f"❌ Error: Unexpected error occurred - {str(e)}"
+        error = f"❌ Error: Unexpected error occurred - {str(e)}"
+    else:
+        return
+    finally:
+        if error:
+            step.fail(error)
+        step.finish()
+    yield error
@@ -0,0 +1,198 @@
+"""
+Client-side rate limiting for model requests
+Token buckets for requests/min and tokens/min plus a concurrency cap, one set per model.
+Requests that cannot be sent yet wait in line for up to a bounded time instead of going out
+and coming back as upstream 429s.
+"""
+
+import json
+import os
+import threading
+import time
+
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv("OPENROUTER_RPM", "120"))
+# 0 disables the tokens/min bucket
+DEFAULT_TOKENS_PER_MINUTE = float(os.getenv("OPENROUTER_TPM", "0"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "16"))
+# Longest a request may wait for its turn before giving up
+DEFAULT_MAX_WAIT = float(os.getenv("OPENROUTER_QUEUE_TIMEOUT", "60"))
+# Per-model overrides, e.g. {"mistralai/mistral-7b-instruct": {"rpm": 60, "tpm": 200000, "concurrency": 8}}
+MODEL_LIMITS = json.loads(os.getenv("OPENROUTER_RATE_LIMITS", "{}"))
+# Shorter waits (lock hand-offs, scheduler jitter) are not counted as queueing
+MIN_REPORTED_WAIT = 0.01
+
+
+class RateLimitTimeout(Exception):
+    """A request waited max_wait seconds without getting its turn"""
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket of per_minute units, holding at most one minute's worth.
+    Reservations may overdraw it; the caller then waits until the balance is back to zero.
+    """
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self._level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+
+    def reserve(self, amount, now):
+        """Take amount and return the seconds until the bucket is no longer overdrawn"""
+        self._refill(now)
+        self._level -= min(amount, self.capacity)
+        return max(0.0, -self._level * 60.0 / self.per_minute)
+
+    def refund(self, amount, now):
+        """Return an unused reservation"""
+        self._refill(now)
+        self._level = min(self.capacity, self._level + min(amount, self.capacity))
+
+
+class Permit:
+    """Admission for one request; settle() returns tokens that were reserved but not used"""
+
+    def __init__(self, limiter, tokens):
+        self._limiter = limiter
+        self.tokens = tokens
+
+    def settle(self, usage):
+        """Refund the difference between the reserved tokens and the usage the response reported"""
+        usage = usage or {}
+        used = (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+        if used and used < self.tokens:
+            self._limiter._refund_tokens(self.tokens - used)
+            self.tokens = used
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._limiter._release()
+
+
+class ModelLimiter:
+    """
+    Admission control for one model. acquire() blocks until a request fits the requests/min and
+    tokens/min buckets and a concurrency slot is free, or raises RateLimitTimeout after max_wait.
+    Use the returned Permit as a context manager so the slot is released when the response closes.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, max_wait=DEFAULT_MAX_WAIT):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_wait = max_wait
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._condition = threading.Condition()
+        self._active = 0
+        self._stats = {
+            "admitted": 0, "timeouts": 0, "queued": 0, "max_queued": 0,
+            "waited": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+        }
+
+    def acquire(self, tokens=0, max_wait=None):
+        """
+        Wait for a turn to send a request expected to use tokens; returns a Permit.
+        max_wait shortens the limiter's own max_wait for this request.
+        """
+        started = time.monotonic()
+        deadline = started + (self.max_wait if max_wait is None else min(self.max_wait, max_wait))
+        with self._condition:
+            self._stats["queued"] += 1
+            self._stats["max_queued"] = max(self._stats["max_queued"], self._stats["queued"])
+        try:
+            self._wait_for_rate(tokens, started, deadline)
+            self._wait_for_slot(tokens, deadline)
+        except RateLimitTimeout:
+            with self._condition:
+                self._stats["timeouts"] += 1
+            raise
+        finally:
+            with self._condition:
+                self._stats["queued"] -= 1
+
+        waited = time.monotonic() - started
+        with self._condition:
+            self._stats["admitted"] += 1
+            if waited >= MIN_REPORTED_WAIT:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds"] += waited
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+        return Permit(self, tokens)
+
+    def _wait_for_rate(self, tokens, now, deadline):
+        """Reserve one request and tokens from the buckets, then sleep until they are covered"""
+        with self._condition:
+            delay = 0.0
+            if self._requests is not None:
+                delay = max(delay, self._requests.reserve(1, now))
+            if self._tokens is not None and tokens:
+                delay = max(delay, self._tokens.reserve(tokens, now))
+            if now + delay > deadline:
+                self._refund(tokens, now)
+                raise RateLimitTimeout(f"The request would have to wait {delay:.0f} s for the rate limit")
+        time.sleep(delay)
+
+    def _wait_for_slot(self, tokens, deadline):
+        """Take a concurrency slot, waiting for one to be released if all are busy"""
+        with self._condition:
+            while self._active >= self.max_concurrency:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._refund(tokens, time.monotonic())
+                    raise RateLimitTimeout(f"All {self.max_concurrency} request slots stayed busy")
+                self._condition.wait(remaining)
+            self._active += 1
+
+    def _refund(self, tokens, now):
+        """Give back a reservation that was never sent; call with the condition held"""
+        if self._requests is not None:
+            self._requests.refund(1, now)
+        if self._tokens is not None and tokens:
+            self._tokens.refund(tokens, now)
+
+    def _refund_tokens(self, tokens):
+        if self._tokens is not None:
+            with self._condition:
+                self._tokens.refund(tokens, time.monotonic())
+
+    def _release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def stats(self):
+        """
+        Return admission counters: requests admitted and timed out, current and peak queue depth,
+        how many had to wait and for how long, and the slots in use
+        """
+        with self._condition:
+            stats = dict(self._stats, active=self._active, max_concurrency=self.max_concurrency)
+        stats["mean_wait_seconds"] = stats["wait_seconds"] / stats["waited"] if stats["waited"] else 0.0
+        return stats
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model):
+    """Return the process-wide limiter for a model, configured from OPENROUTER_RATE_LIMITS or the defaults"""
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limits = MODEL_LIMITS.get(model, {})
+            limiter = ModelLimiter(
+                requests_per_minute=limits.get("rpm", DEFAULT_REQUESTS_PER_MINUTE),
+                tokens_per_minute=limits.get("tpm", DEFAULT_TOKENS_PER_MINUTE),
+                max_concurrency=limits.get("concurrency", DEFAULT_MAX_CONCURRENCY),
+                max_wait=limits.get("max_wait", DEFAULT_MAX_WAIT),
+            )
+            _limiters[model] = limiter
+        return limiter
@@ -0,0 +1,298 @@
+"""
+Persistent response cache for generated project content
+Backed by SQLite in WAL mode so every Streamlit worker process shares the same entries
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "responses.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def make_cache_key(model, temperature, max_tokens, messages):
+    """
+    Build a canonical hash for a completion request.
+    Keys only depend on the values that change the model output, never on dict ordering.
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens),
+            "messages": messages,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_section_cache_key(model, temperature, section_digest, version):
+    """
+    Build the key for one cached section of a project package.
+    Keyed by the section's config digest rather than its prompt text, and independent of
+    max_tokens; bump version whenever the prompts that produce sections change.
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "section": section_digest,
+            "version": version,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return "section:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cross-process cache of completion text with TTL expiry and size-based LRU eviction.
+    Cache failures are logged and treated as misses so generation never depends on the cache.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self):
+        """Return this thread's connection, creating the database on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript("""
+                        CREATE TABLE IF NOT EXISTS responses (
+                            key TEXT PRIMARY KEY,
+                            value TEXT NOT NULL,
+                            size INTEGER NOT NULL,
+                            created_at REAL NOT NULL,
+                            last_access REAL NOT NULL
+                        );
+                        CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+                        CREATE TABLE IF NOT EXISTS counters (
+                            name TEXT PRIMARY KEY,
+                            value INTEGER NOT NULL
+                        );
+                        CREATE TABLE IF NOT EXISTS leases (
+                            key TEXT PRIMARY KEY,
+                            owner TEXT NOT NULL,
+                            expires_at REAL NOT NULL,
+                            value TEXT
+                        );
+                    """)
+                    self._schema_ready = True
+        return conn
+
+    def _bump(self, conn, name):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expired entry"""
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bump(conn, "misses")
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._bump(conn, "hits")
+            return row[0]
+        except sqlite3.Error as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+
+    def set(self, key, value, ttl_seconds=None):
+        """
+        Store value under key and evict expired or least recently used entries.
+        ttl_seconds keeps this entry for less than the cache's TTL.
+        """
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        # Entries expire ttl_seconds after created_at, so a shorter-lived one is stored as if older
+        created_at = now
+        if ttl_seconds is not None and ttl_seconds < self.ttl_seconds:
+            created_at = now - (self.ttl_seconds - ttl_seconds)
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, created_at, now),
+            )
+            self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning("Response cache write failed: %s", e)
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then the least recently used rows until under max_bytes"""
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+            stale = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+            for _ in stale:
+                self._bump(conn, "evictions")
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        """Remove a single entry"""
+        try:
+            self._connection().execute("DELETE FROM responses WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning("Response cache delete failed: %s", e)
+
+    def clear(self):
+        """Remove all entries and leases and reset the counters"""
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM counters")
+            conn.execute("DELETE FROM leases")
+        except sqlite3.Error as e:
+            logger.warning("Response cache clear failed: %s", e)
+
+    def acquire_lease(self, key, owner, lease_seconds):
+        """
+        Claim the right to generate key for lease_seconds, across every process sharing the database.
+        Expired leases and finished ones (whose result was already handed to the processes
+        waiting for it) can be claimed. Returns True when owner now holds the lease. Fails open:
+        if the database is unavailable the caller simply generates on its own.
+        """
+        now = time.time()
+        try:
+            cursor = self._connection().execute(
+                "INSERT INTO leases (key, owner, expires_at, value) VALUES (?, ?, ?, NULL) "
+                "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at, value = NULL "
+                "WHERE leases.expires_at < ? OR leases.value IS NOT NULL",
+                (key, owner, now + lease_seconds, now),
+            )
+            return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            logger.warning("Response cache lease failed: %s", e)
+            return True
+
+    def renew_lease(self, key, owner, lease_seconds):
+        """Extend a lease owner still holds"""
+        try:
+            self._connection().execute(
+                "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ? AND value IS NULL",
+                (time.time() + lease_seconds, key, owner),
+            )
+        except sqlite3.Error as e:
+            logger.warning("Response cache lease renewal failed: %s", e)
+
+    def complete_lease(self, key, owner, value, keep_seconds):
+        """Publish the result of a leased generation to waiting processes for keep_seconds"""
+        try:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE leases SET value = ?, expires_at = ? WHERE key = ? AND owner = ?",
+                (value, time.time() + keep_seconds, key, owner),
+            )
+            conn.execute("DELETE FROM leases WHERE expires_at < ?", (time.time(),))
+        except sqlite3.Error as e:
+            logger.warning("Response cache lease completion failed: %s", e)
+
+    def release_lease(self, key, owner):
+        """Give up an unfinished lease so another process can take over"""
+        try:
+            self._connection().execute(
+                "DELETE FROM leases WHERE key = ? AND owner = ? AND value IS NULL", (key, owner)
+            )
+        except sqlite3.Error as e:
+            logger.warning("Response cache lease release failed: %s", e)
+
+    def lease_result(self, key):
+        """
+        Return (held, value) for key: value is the published result (or None), and held is
+        True while another process is still generating it
+        """
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM leases WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Response cache lease read failed: %s", e)
+            return False, None
+        if row is None or row[1] < time.time():
+            return False, None
+        return row[0] is None, row[0]
+
+    def stats(self):
+        """Return hit/miss counters and current size, shared across all processes"""
+        stats = {"hits": 0, "misses": 0, "evictions": 0, "entries": 0, "bytes": 0}
+        try:
+            conn = self._connection()
+            for name, value in conn.execute("SELECT name, value FROM counters"):
+                stats[name] = value
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            stats["entries"] = entries
+            stats["bytes"] = total
+        except sqlite3.Error as e:
+            logger.warning("Response cache stats failed: %s", e)
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide cache configured from environment variables"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResponseCache(
+                    path=os.getenv("PROJECT_CACHE_PATH", DEFAULT_CACHE_PATH),
+                    ttl_seconds=float(os.getenv("PROJECT_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+                    max_bytes=int(os.getenv("PROJECT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                )
+    return _default_cache
@@ -0,0 +1,210 @@
+"""
+Single-flight request coalescing
+Identical requests that arrive while one is already in flight attach to it instead of calling
+the model again. Inside a process every caller receives the leader's chunks as they stream in;
+across processes a lease in the shared SQLite database elects one leader and the others pick up
+its finished result.
+"""
+
+import math
+import os
+import threading
+import time
+import uuid
+
+from deadline import Deadline
+from response_cache import get_response_cache
+
+# How long a cross-process lease lasts without a new chunk; covers a connect plus a full read timeout
+LEASE_SECONDS = float(os.getenv("SINGLE_FLIGHT_LEASE_SECONDS", "100"))
+# How long a finished result stays readable by processes that were waiting for it
+RESULT_SECONDS = float(os.getenv("SINGLE_FLIGHT_RESULT_SECONDS", "30"))
+POLL_INTERVAL = 0.2
+
+
+class _Flight:
+    """Chunks produced so far for one key, shared by every caller waiting on it"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.subscribers = 0
+        self.abandoned = False
+        # Stops the producer once every caller has stopped reading; callers' own deadlines only bound their waits
+        self.deadline = Deadline(math.inf)
+        # Filled in by the producer (e.g. "finish_reason", "usage") and copied to every caller at the end
+        self.meta = {}
+        self.condition = threading.Condition()
+
+    def publish(self, chunk):
+        with self.condition:
+            self.chunks.append(chunk)
+            self.condition.notify_all()
+
+    def finish(self):
+        with self.condition:
+            self.done = True
+            self.condition.notify_all()
+
+    def follow(self, deadline=None):
+        """
+        Yield every chunk from the start, then new ones as they are published.
+        Raises DeadlineExceeded if deadline passes (or Cancelled if it is cancelled) while
+        waiting for the next chunk.
+        """
+        position = 0
+        while True:
+            with self.condition:
+                while position >= len(self.chunks) and not self.done:
+                    if deadline is None:
+                        self.condition.wait()
+                    else:
+                        # Wake up regularly so a cancelled deadline is noticed promptly
+                        deadline.check()
+                        self.condition.wait(min(deadline.remaining(), POLL_INTERVAL))
+                if position >= len(self.chunks):
+                    return
+                chunk = self.chunks[position]
+            position += 1
+            yield chunk
+
+
+class SingleFlight:
+    """
+    Runs each key's producer at most once at a time.
+    The producer (an iterator of text chunks) runs on its own thread so that callers can stop
+    reading at any point; it is only abandoned once every caller has stopped. With a lease_store
+    (see ResponseCache.acquire_lease) the same holds across processes sharing the database.
+    """
+
+    def __init__(self, lease_store=None, lease_seconds=LEASE_SECONDS, result_seconds=RESULT_SECONDS,
+                 poll_interval=POLL_INTERVAL):
+        self.lease_store = lease_store
+        self.lease_seconds = lease_seconds
+        self.result_seconds = result_seconds
+        self.poll_interval = poll_interval
+        self._owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._stats = {"leaders": 0, "followers": 0, "remote_followers": 0}
+
+    def stream(self, key, produce, deadline=None, meta=None):
+        """
+        Yield the chunks of produce(flight_deadline, flight_meta) for key, sharing one run among
+        concurrent callers. produce is called only by the leader, with the flight's own Deadline,
+        which is cancelled once every caller has stopped reading; it must not use any caller's
+        deadline, or one caller giving up would end the flight for all of them. Whatever produce
+        puts in flight_meta is copied into each caller's meta dict once the chunks end. A caller
+        whose deadline passes stops waiting (DeadlineExceeded) and is counted as having stopped reading.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None or flight.abandoned:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._stats["leaders"] += 1
+                threading.Thread(
+                    target=self._lead, args=(key, flight, produce), daemon=True, name="single-flight"
+                ).start()
+            else:
+                self._stats["followers"] += 1
+            flight.subscribers += 1
+        try:
+            yield from flight.follow(deadline)
+            if meta is not None:
+                meta.update(flight.meta)
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                if not flight.subscribers and not flight.done:
+                    flight.abandoned = True
+                    flight.deadline.cancel()
+
+    def call(self, key, produce, deadline=None, meta=None):
+        """Blocking form of stream(): return the joined chunks"""
+        return "".join(self.stream(key, produce, deadline, meta))
+
+    def stats(self):
+        """Return how many calls led a flight and how many attached to one"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _lead(self, key, flight, produce):
+        """Produce chunks for a flight, or wait for another process that already is"""
+        try:
+            if self.lease_store is None or self._acquire(key, flight):
+                self._produce(key, flight, produce)
+        except Exception as e:
+            flight.publish(f"❌ Error: Unexpected error occurred - {str(e)}")
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.finish()
+
+    def _acquire(self, key, flight):
+        """
+        Take the cross-process lease for key, or wait for its holder's result.
+        Returns True when this process should produce; False once a result was published.
+        """
+        if self.lease_store.acquire_lease(key, self._owner, self.lease_seconds):
+            return True
+        while not flight.abandoned:
+            time.sleep(self.poll_interval)
+            # Only results published while this process was waiting are picked up here
+            held, value = self.lease_store.lease_result(key)
+            if value is not None:
+                with self._lock:
+                    self._stats["remote_followers"] += 1
+                flight.publish(value)
+                return False
+            # The holder gave up or its lease expired without a result; try to take over
+            if not held and self.lease_store.acquire_lease(key, self._owner, self.lease_seconds):
+                return True
+        return False
+
+    def _produce(self, key, flight, produce):
+        chunks = []
+        completed = False
+        renewed = time.monotonic()
+        iterator = produce(flight.deadline, flight.meta)
+        try:
+            for chunk in iterator:
+                if flight.abandoned:
+                    break
+                chunks.append(chunk)
+                flight.publish(chunk)
+                if self.lease_store is not None and time.monotonic() - renewed > self.lease_seconds / 3:
+                    self.lease_store.renew_lease(key, self._owner, self.lease_seconds)
+                    renewed = time.monotonic()
+            # A response cut off at its output budget is not handed to other processes, which have
+            # no way to see that it was cut off; they produce their own instead
+            completed = not flight.abandoned and flight.meta.get("finish_reason") != "length"
+        finally:
+            # Closing the producer early closes its upstream response too
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            if self.lease_store is not None:
+                if completed:
+                    self.lease_store.complete_lease(key, self._owner, "".join(chunks), self.result_seconds)
+                else:
+                    self.lease_store.release_lease(key, self._owner)
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """
+    Return the process-wide SingleFlight. Cross-process coalescing uses the response cache
+    database unless SINGLE_FLIGHT_CROSS_PROCESS=0.
+    """
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                shared = os.getenv("SINGLE_FLIGHT_CROSS_PROCESS", "1") != "0"
+                _single_flight = SingleFlight(lease_store=get_response_cache() if shared else None)
+    return _single_flight
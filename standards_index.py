@@ -0,0 +1,180 @@
+"""
+Read-only standards index shared by every session in the process
+Built over the on-disk standards store into compact slotted records with precomputed option lists
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+from standards_store import DEFAULT_CACHE_SIZE, get_standards_store
+
+
+class StandardRecord:
+    """A single standard and its elements (sub-standards)"""
+    __slots__ = ("state", "content_area", "grade", "code", "title", "elements", "element_codes")
+
+    def __init__(self, state, content_area, grade, code, title, element_items):
+        self.state = state
+        self.content_area = content_area
+        self.grade = grade
+        self.code = code
+        self.title = title
+        self.elements = tuple(
+            ElementRecord(sys.intern(element_code), description, self)
+            for element_code, description in element_items
+        )
+        self.element_codes = tuple(element.code for element in self.elements)
+
+    def element(self, code):
+        """Return the element with the given code, or None"""
+        for element in self.elements:
+            if element.code == code:
+                return element
+        return None
+
+    def __repr__(self):
+        return f"StandardRecord({self.code!r})"
+
+
+class ElementRecord:
+    """A single element (sub-standard) of a standard"""
+    __slots__ = ("code", "description", "standard")
+
+    def __init__(self, code, description, standard):
+        self.code = code
+        self.description = description
+        self.standard = standard
+
+    def __repr__(self):
+        return f"ElementRecord({self.code!r})"
+
+
+class _PartitionIndex:
+    """Records for one state and content area"""
+    __slots__ = ("standards", "standard_codes", "by_code")
+
+    def __init__(self, state, content_area, grade_map):
+        intern = sys.intern
+        self.standards = {}
+        self.standard_codes = {}
+        self.by_code = {}
+        for grade, standard_map in grade_map.items():
+            grade = intern(grade)
+            records = tuple(
+                StandardRecord(state, content_area, grade, intern(code), info.get('title', ''),
+                               info.get('elements', {}).items())
+                for code, info in standard_map.items()
+            )
+            self.standards[grade] = records
+            self.standard_codes[grade] = tuple(record.code for record in records)
+            for record in records:
+                self.by_code.setdefault(record.code, record)
+                for element in record.elements:
+                    self.by_code.setdefault(element.code, element)
+
+
+class StandardsIndex:
+    """
+    Read-only index over a StandardsStore.
+    State, content area and grade option lists come from the store manifest and are
+    precomputed tuples in database order. Standards for a state and content area are turned
+    into records the first time they are needed, and the cache_size most recently used
+    partitions are kept, so the index stays small however many states are on disk.
+    Any standard or element code resolves to its record in O(1).
+    """
+    __slots__ = ("_store", "_cache_size", "_states", "_content_areas", "_grades", "_partitions", "_lock")
+
+    def __init__(self, store, cache_size=DEFAULT_CACHE_SIZE):
+        intern = sys.intern
+        self._store = store
+        self._cache_size = cache_size
+        self._states = tuple(intern(state) for state in store.states())
+        self._content_areas = {
+            state: tuple(intern(area) for area in store.content_areas(state))
+            for state in self._states
+        }
+        self._grades = {
+            (state, area): tuple(intern(grade) for grade in store.grades(state, area))
+            for state, areas in self._content_areas.items()
+            for area in areas
+        }
+        self._partitions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _partition(self, state, content_area):
+        key = (state, content_area)
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is not None:
+                self._partitions.move_to_end(key)
+                return partition
+        if key not in self._grades:
+            return None
+        partition = _PartitionIndex(
+            sys.intern(state), sys.intern(content_area), self._store.read_partition(state, content_area)
+        )
+        with self._lock:
+            self._partitions[key] = partition
+            while len(self._partitions) > self._cache_size:
+                self._partitions.popitem(last=False)
+        return partition
+
+    def states(self):
+        """Return the available states"""
+        return self._states
+
+    def content_areas(self, state):
+        """Return the content areas for a state"""
+        return self._content_areas.get(state, ())
+
+    def grades(self, state, content_area):
+        """Return the grade levels for a state and content area"""
+        return self._grades.get((state, content_area), ())
+
+    def standards(self, state, content_area, grade):
+        """Return the standard records for a state, content area and grade"""
+        partition = self._partition(state, content_area)
+        return partition.standards.get(grade, ()) if partition else ()
+
+    def standard_codes(self, state, content_area, grade):
+        """Return the standard codes for a state, content area and grade"""
+        partition = self._partition(state, content_area)
+        return partition.standard_codes.get(grade, ()) if partition else ()
+
+    def lookup(self, code, state=None, content_area=None):
+        """
+        Return the StandardRecord or ElementRecord for a code, or None.
+        Pass state and content_area when known; otherwise the store's code map locates it
+        (within state, when given, as codes can be shared by several states).
+        """
+        if state is None or content_area is None:
+            location = self._store.locate(code, state)
+            if location is None:
+                return None
+            state, content_area = location
+        partition = self._partition(state, content_area)
+        return partition.by_code.get(code) if partition else None
+
+    def iter_standards(self):
+        """Yield every standard record in database order, loading partitions as it goes"""
+        for state in self._states:
+            for content_area in self._content_areas[state]:
+                partition = self._partition(state, content_area)
+                for grade in self._grades[(state, content_area)]:
+                    yield from partition.standards.get(grade, ())
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_standards_index():
+    """Return the process-wide standards index over the default store"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                store = get_standards_store()
+                _index = StandardsIndex(store, cache_size=store.cache_size)
+    return _index
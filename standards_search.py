@@ -0,0 +1,236 @@
+"""
+Full-text search over standards
+An in-memory inverted index over standard codes, titles and element descriptions, built once
+per process. Every sub-standard (element) is one document, so a result can jump straight to it.
+"""
+
+import heapq
+import math
+import re
+import sys
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from standards_index import get_standards_index
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+
+# Field weights: codes are the most specific thing a teacher can type
+FIELD_WEIGHTS = {
+    "element_code": 4.0,
+    "standard_code": 3.0,
+    "standard_title": 2.0,
+    "element_description": 1.0,
+}
+# Longest list of vocabulary terms a single prefix may expand to
+MAX_PREFIX_EXPANSIONS = 64
+# Prefix matches score lower than whole-word matches
+PREFIX_PENALTY = 0.6
+# Shorter query tokens match too much to be useful and are ignored
+MIN_TOKEN_LENGTH = 2
+# Query words ignored unless the query has nothing else (then only the last one is used)
+STOPWORDS = frozenset({
+    "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it",
+    "of", "on", "or", "that", "the", "their", "to", "with",
+})
+
+
+def tokenize(text, split_codes=True):
+    """
+    Lowercase text into tokens. Dotted codes yield the whole code plus (with split_codes)
+    its parts, so "MGSE6.RP.1a" is indexed as "mgse6.rp.1a", "mgse6", "rp" and "1a".
+    """
+    tokens = []
+    for match in _TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        if split_codes and "." in match:
+            tokens.extend(part for part in match.split(".") if part)
+    return tokens
+
+
+class SearchResult:
+    """A matching sub-standard with its position in the cascade"""
+    __slots__ = ("state", "content_area", "grade", "standard", "sub_standard", "title", "description", "score")
+
+    def __init__(self, doc, score):
+        self.state, self.content_area, self.grade, self.standard, self.sub_standard, self.title, self.description = doc
+        self.score = score
+
+    def label(self):
+        return f"{self.sub_standard} · {self.grade} {self.content_area} — {self.description}"
+
+    def __repr__(self):
+        return f"SearchResult({self.sub_standard!r}, score={self.score:.2f})"
+
+
+class StandardsSearchIndex:
+    """
+    Inverted index with BM25-style term weighting, field boosts and prefix matching.
+    Every query token must match. The last token also matches as a prefix (it is the word
+    still being typed), as do earlier tokens that are not whole words in the index.
+    """
+
+    def __init__(self, standards):
+        self._docs = []
+        postings = defaultdict(dict)
+
+        for record in standards:
+            for element in record.elements:
+                doc_id = len(self._docs)
+                self._docs.append((record.state, record.content_area, record.grade, record.code,
+                                   element.code, record.title, element.description))
+                fields = {
+                    "element_code": element.code,
+                    "standard_code": record.code,
+                    "standard_title": record.title,
+                    "element_description": element.description,
+                }
+                for field, text in fields.items():
+                    tokens = tokenize(text)
+                    # Dampen long fields so a term in a short title outweighs one in a paragraph
+                    norm = 1.0 / math.sqrt(max(1, len(tokens)))
+                    for token in tokens:
+                        weights = postings[sys.intern(token)]
+                        weights[doc_id] = weights.get(doc_id, 0.0) + FIELD_WEIGHTS[field] * norm
+
+        total = max(1, len(self._docs))
+        self._postings = {}
+        for token, weights in postings.items():
+            idf = math.log(1 + (total - len(weights) + 0.5) / (len(weights) + 0.5))
+            # Postings are stored best-first, so the top documents for a term are its first entries
+            ranked = sorted(weights.items(), key=lambda item: (-item[1], item[0]))
+            self._postings[token] = {doc_id: weight * idf for doc_id, weight in ranked}
+        self._vocabulary = sorted(self._postings)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _expand(self, token, prefix=True):
+        """
+        (term, factor) pairs a query token matches: itself, then up to MAX_PREFIX_EXPANSIONS longer
+        terms. With prefix=False a token that is a whole word matches only that word.
+        """
+        terms = [(token, 1.0)] if token in self._postings else []
+        if terms and not prefix:
+            return terms
+        start = bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not term.startswith(token):
+                break
+            if term != token:
+                terms.append((term, PREFIX_PENALTY))
+        return terms
+
+    def _candidates(self, terms):
+        """Doc id -> best score over all of a token's terms"""
+        scores = {}
+        for term, factor in terms:
+            for doc_id, weight in self._postings[term].items():
+                weight *= factor
+                if weight > scores.get(doc_id, 0.0):
+                    scores[doc_id] = weight
+        return scores
+
+    def _search_single(self, terms, limit, state):
+        """
+        Fast path for one-token queries (the common search-as-you-type case): only the first
+        matching entries of each term's best-first postings can reach the top results.
+        """
+        scores = {}
+        for term, factor in terms:
+            taken = 0
+            for doc_id, weight in self._postings[term].items():
+                if taken == limit:
+                    break
+                if state is not None and self._docs[doc_id][0] != state:
+                    continue
+                taken += 1
+                weight *= factor
+                if weight > scores.get(doc_id, 0.0):
+                    scores[doc_id] = weight
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [SearchResult(self._docs[doc_id], score) for doc_id, score in best]
+
+    def search(self, query, limit=10, state=None):
+        """Return up to limit SearchResults for query, best first"""
+        tokens = [
+            token for token in dict.fromkeys(tokenize(query, split_codes=False))
+            if len(token) >= MIN_TOKEN_LENGTH
+        ]
+        tokens = [token for token in tokens if token not in STOPWORDS] or tokens[-1:]
+        if not tokens:
+            return []
+        # Earlier words are complete; only the word still being typed is a prefix by default
+        expansions = [self._expand(token, prefix=(i == len(tokens) - 1)) for i, token in enumerate(tokens)]
+        if not all(expansions):
+            return []
+        if len(expansions) == 1:
+            return self._search_single(expansions[0], limit, state)
+
+        # Start from the token with the fewest postings, then only score those candidates for the rest
+        expansions.sort(key=lambda terms: sum(len(self._postings[term]) for term, _ in terms))
+        combined = self._candidates(expansions[0])
+        if state is not None:
+            combined = {doc_id: score for doc_id, score in combined.items() if self._docs[doc_id][0] == state}
+
+        for terms in expansions[1:]:
+            postings = [(self._postings[term], factor) for term, factor in terms]
+            narrowed = {}
+            for doc_id, score in combined.items():
+                best = 0.0
+                for weights, factor in postings:
+                    weight = weights.get(doc_id)
+                    if weight and weight * factor > best:
+                        best = weight * factor
+                if best:
+                    narrowed[doc_id] = score + best
+            combined = narrowed
+            if not combined:
+                return []
+
+        best = heapq.nsmallest(limit, combined.items(), key=lambda item: (-item[1], item[0]))
+        return [SearchResult(self._docs[doc_id], score) for doc_id, score in best]
+
+
+class ShardedSearchIndex:
+    """
+    One StandardsSearchIndex per state. The UI always searches within the selected state, so
+    query cost depends on that state's size rather than on how many states are loaded.
+    """
+
+    def __init__(self, standards):
+        by_state = defaultdict(list)
+        for record in standards:
+            by_state[record.state].append(record)
+        self._shards = {state: StandardsSearchIndex(records) for state, records in by_state.items()}
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards.values())
+
+    def search(self, query, limit=10, state=None):
+        """Return up to limit SearchResults for query, best first, optionally within one state"""
+        if state is not None:
+            shard = self._shards.get(state)
+            return shard.search(query, limit) if shard else []
+        results = [result for shard in self._shards.values() for result in shard.search(query, limit)]
+        return heapq.nlargest(limit, results, key=lambda result: result.score)
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Return the process-wide search index, building it on first use"""
+    global _search_index
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                _search_index = ShardedSearchIndex(get_standards_index().iter_standards())
+    return _search_index
+
+
+def search_standards(query, limit=10, state=None):
+    """Search every standard and element; see StandardsSearchIndex.search"""
+    return get_search_index().search(query, limit=limit, state=state)
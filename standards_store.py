@@ -0,0 +1,200 @@
+"""
+On-disk standards store
+Standards live in compact JSON partitions, one per state and content area, described by a small
+manifest. Partitions are loaded on demand and kept in a bounded LRU cache, so startup cost and
+memory do not grow with the number of states or grades on disk.
+
+Layout of a store directory:
+    manifest.json                      states -> content areas -> {"path", "grades"}
+    codes.json                         standard/element code -> [[state, content area], ...]
+    <state>/<content-area>.json        grade -> standard code -> {"title", "elements"}
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "standards_data")
+DEFAULT_CACHE_SIZE = 32
+
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_json(path, data, indent):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent, separators=(",", ": ") if indent else (",", ":"))
+        f.write("\n")
+
+
+def write_store(standards_data, root, indent=2):
+    """
+    Write a nested standards dict (state -> content area -> grade -> standard) as a store directory.
+    Use indent=None for the most compact files.
+    """
+    manifest = {"version": 2, "states": {}}
+    codes = {}
+    for state, area_map in standards_data.items():
+        manifest["states"][state] = {}
+        for content_area, grade_map in area_map.items():
+            path = f"{_slug(state)}/{_slug(content_area)}.json"
+            manifest["states"][state][content_area] = {"path": path, "grades": list(grade_map)}
+            _write_json(os.path.join(root, path), grade_map, indent)
+            # States may share codes (e.g. adopted national standards), so every location is kept
+            location = [state, content_area]
+            for standard_map in grade_map.values():
+                for code, info in standard_map.items():
+                    for located in (code, *info.get("elements", {})):
+                        locations = codes.setdefault(located, [])
+                        if location not in locations:
+                            locations.append(location)
+    _write_json(os.path.join(root, "codes.json"), codes, indent)
+    _write_json(os.path.join(root, "manifest.json"), manifest, indent)
+
+
+class StandardsStore:
+    """
+    Lazy reader for a store directory.
+    Only the manifest is read up front; partitions are parsed on first access and the
+    cache_size most recently used ones are kept in memory. The code map is read only the
+    first time a code has to be located.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, cache_size=DEFAULT_CACHE_SIZE):
+        self.root = root
+        self.cache_size = cache_size
+        self._manifest = _read_json(os.path.join(root, "manifest.json"))["states"]
+        self._partitions = OrderedDict()
+        self._codes = None
+        self._lock = threading.Lock()
+
+    def states(self):
+        """Return the available states"""
+        return list(self._manifest)
+
+    def content_areas(self, state):
+        """Return the content areas for a state"""
+        return list(self._manifest.get(state, {}))
+
+    def grades(self, state, content_area):
+        """Return the grade levels for a state and content area, without loading the partition"""
+        return list(self._manifest.get(state, {}).get(content_area, {}).get("grades", ()))
+
+    def read_partition(self, state, content_area):
+        """Read one partition from disk without caching it ({} if unknown)"""
+        entry = self._manifest.get(state, {}).get(content_area)
+        if entry is None:
+            return {}
+        return _read_json(os.path.join(self.root, entry["path"]))
+
+    def partition(self, state, content_area):
+        """Return grade -> standard code -> info for one state and content area ({} if unknown)"""
+        key = (state, content_area)
+        with self._lock:
+            if key in self._partitions:
+                self._partitions.move_to_end(key)
+                return self._partitions[key]
+        data = self.read_partition(state, content_area)
+        if not data:
+            return data
+        with self._lock:
+            self._partitions[key] = data
+            self._partitions.move_to_end(key)
+            while len(self._partitions) > self.cache_size:
+                self._partitions.popitem(last=False)
+        return data
+
+    def locate(self, code, state=None):
+        """
+        Return the (state, content area) containing a standard or element code, or None.
+        A code several states share is located in state when given, otherwise in the first
+        state that has it.
+        """
+        if self._codes is None:
+            codes = _read_json(os.path.join(self.root, "codes.json"))
+            with self._lock:
+                if self._codes is None:
+                    self._codes = codes
+        locations = self._codes.get(code) or []
+        if locations and isinstance(locations[0], str):
+            # Version 1 stores kept a single [state, content area] per code
+            locations = [locations]
+        for location in locations:
+            if state is None or location[0] == state:
+                return tuple(location)
+        return None
+
+    def cached_partitions(self):
+        """Number of partitions currently held in memory"""
+        with self._lock:
+            return len(self._partitions)
+
+
+class LazyStandardsData(Mapping):
+    """
+    Read-only mapping with the same shape as the original nested standards dict.
+    Indexing a state and content area loads that partition from the store on demand, so the
+    existing get_states/get_content_areas/... helpers keep working unchanged.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, state):
+        if state not in self._store.states():
+            raise KeyError(state)
+        return _LazyStateData(self._store, state)
+
+    def __iter__(self):
+        return iter(self._store.states())
+
+    def __len__(self):
+        return len(self._store.states())
+
+
+class _LazyStateData(Mapping):
+    """Content areas of one state; values are loaded partitions"""
+
+    def __init__(self, store, state):
+        self._store = store
+        self._state = state
+
+    def __getitem__(self, content_area):
+        if content_area not in self._store.content_areas(self._state):
+            raise KeyError(content_area)
+        return self._store.partition(self._state, content_area)
+
+    def __iter__(self):
+        return iter(self._store.content_areas(self._state))
+
+    def __len__(self):
+        return len(self._store.content_areas(self._state))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_standards_store():
+    """Return the process-wide store, configured by STANDARDS_DATA_DIR and STANDARDS_CACHE_SIZE"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = StandardsStore(
+                    root=os.getenv("STANDARDS_DATA_DIR", DEFAULT_STORE_DIR),
+                    cache_size=int(os.getenv("STANDARDS_CACHE_SIZE", DEFAULT_CACHE_SIZE)),
+                )
+    return _default_store
@@ -0,0 +1,95 @@
+"""
+SectionParser: where parts split by SECTION_SEPARATOR and section headings end up
+Run with: python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from project_generator import (SECTION_LESSON_PLAN, SECTION_MODIFICATION, SECTION_SEPARATOR,
+                               SECTION_STANDARD_PROJECT, SectionJob, parse_package)
+
+STANDARD_PROJECT = (SECTION_STANDARD_PROJECT, None)
+LESSON_PLAN = (SECTION_LESSON_PLAN, None)
+DYSLEXIA = (SECTION_MODIFICATION, "Dyslexia")
+
+JOBS = [
+    SectionJob(SECTION_STANDARD_PROJECT, "prompt"),
+    SectionJob(SECTION_LESSON_PLAN, "prompt"),
+    SectionJob(SECTION_MODIFICATION, "prompt", "Dyslexia"),
+]
+
+
+def package(*parts):
+    return f"\n{SECTION_SEPARATOR}\n".join(parts)
+
+
+def test_part_opening_with_a_new_subsection_is_the_next_section():
+    document = parse_package(package(
+        "## 1. STANDARD PROJECT\n### Project Title\nfoo\n",
+        "### Lesson Plan Header\nbar\n",
+        "## 3. ACCESSIBILITY MODIFICATION: DYSLEXIA VERSION\nbaz\n",
+    ), JOBS)
+    assert document.missing_report() == []
+    assert "bar" not in document.get(*STANDARD_PROJECT).text
+    assert document.get(*LESSON_PLAN).text.startswith("### Lesson Plan Header")
+
+
+def test_separator_inside_a_section_continues_it():
+    # The previous section has no subsections yet
+    document = parse_package(package(
+        "## 1. STANDARD PROJECT\nintro\n",
+        "### Project Title\nfoo\n",
+        "## 2. FORMAL LESSON PLAN\nbar\n",
+    ), JOBS)
+    assert [subsection.title for subsection in document.get(*STANDARD_PROJECT).subsections] == ["Project Title"]
+    assert document.get(*LESSON_PLAN).text == "## 2. FORMAL LESSON PLAN\nbar"
+
+
+def test_separator_before_a_repeated_subsection_continues_the_section():
+    document = parse_package(package(
+        "## 1. STANDARD PROJECT\n### Materials\nfoo\n",
+        "### materials\nmore\n",
+        "## 2. FORMAL LESSON PLAN\nbar\n",
+    ), JOBS)
+    assert "more" in document.get(*STANDARD_PROJECT).text
+    assert document.missing_report() == ["Dyslexia"]
+
+
+def test_part_opening_with_a_seen_section_heading_continues_the_section():
+    document = parse_package(package(
+        "## 1. STANDARD PROJECT\n### Project Title\nfoo\n",
+        "## Standard Project Overview\nmore\n",
+    ), JOBS)
+    assert "more" in document.get(*STANDARD_PROJECT).text
+    assert document.missing_report() == ["Lesson Plan", "Dyslexia"]
+
+
+def test_unrequested_modification_opening_a_part_is_the_next_modification():
+    document = parse_package(package(
+        "## 1. STANDARD PROJECT\nfoo\n",
+        "## 2. FORMAL LESSON PLAN\nbar\n",
+        "## 3. ACCESSIBILITY MODIFICATION: ELL\nbaz\n",
+    ), JOBS)
+    assert set(document.sections) == {STANDARD_PROJECT, LESSON_PLAN, DYSLEXIA}
+    assert document.get(*DYSLEXIA).text.endswith("baz")
+
+
+def test_unrequested_modification_inside_a_part_is_extra():
+    document = parse_package(
+        "## 1. STANDARD PROJECT\nfoo\n## 3. ACCESSIBILITY MODIFICATION: ELL\nbaz\n"
+        "## 4. ACCESSIBILITY MODIFICATION: DYSLEXIA\nqux\n",
+        JOBS,
+    )
+    assert set(document.sections) == {STANDARD_PROJECT, DYSLEXIA}
+    assert [section.text for section in document.extra] == ["## 3. ACCESSIBILITY MODIFICATION: ELL\nbaz"]
+
+
+def test_crlf_headings():
+    document = parse_package(
+        "## 1. STANDARD PROJECT\r\nfoo\r\n## 2. ACCESSIBILITY MODIFICATION: Dyslexia Version\r\nbar\r\n", JOBS
+    )
+    assert set(document.sections) == {STANDARD_PROJECT, DYSLEXIA}
+    assert document.get(*STANDARD_PROJECT).title == "1. STANDARD PROJECT"
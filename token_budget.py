@@ -0,0 +1,82 @@
+"""
+Token budget estimation
+Local, dependency-free token estimates for prompts, and output budgets sized to the sections a
+request asks for, checked against the model's context window before anything is sent.
+"""
+
+import math
+from dataclasses import dataclass
+
+# Average characters per token for English prose and markdown on Llama/Mistral-style tokenizers.
+# Deliberately on the low side so estimates err towards more tokens.
+CHARS_PER_TOKEN = 3.6
+# Role markers and separators added around each chat message
+TOKENS_PER_MESSAGE = 4
+
+MODEL_CONTEXT_WINDOWS = {
+    "mistralai/mistral-7b-instruct": 32768,
+    "meta-llama/llama-3.1-8b-instruct": 131072,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+# Room left for estimate error so a request that "just fits" is not rejected upstream
+CONTEXT_SAFETY_MARGIN = 256
+# Below this many output tokens a section cannot be generated meaningfully
+MIN_OUTPUT_TOKENS = 512
+
+
+class TokenBudgetError(ValueError):
+    """The request cannot fit the model's context window"""
+
+
+@dataclass(frozen=True)
+class TokenBudget:
+    """Planned token use for one request"""
+    prompt_tokens: int
+    requested_output_tokens: int
+    max_tokens: int
+    context_window: int
+
+    @property
+    def fits(self):
+        """True when every requested section fits in the output budget"""
+        return self.max_tokens >= self.requested_output_tokens
+
+
+def estimate_tokens(text):
+    """Estimate the token count of a piece of text"""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(messages):
+    """Estimate the prompt tokens for a list of chat messages"""
+    return sum(estimate_tokens(message["content"]) + TOKENS_PER_MESSAGE for message in messages)
+
+
+def context_window(model):
+    """Context window, in tokens, for a model"""
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def plan_budget(messages, requested_output_tokens, model):
+    """
+    Size max_tokens for a request so it covers requested_output_tokens.
+    When the context window cannot hold the full request the budget is reduced to what fits
+    (check TokenBudget.fits to warn); TokenBudgetError is raised when not even
+    MIN_OUTPUT_TOKENS are left after the prompt.
+    """
+    window = context_window(model)
+    prompt_tokens = estimate_message_tokens(messages)
+    available = window - prompt_tokens - CONTEXT_SAFETY_MARGIN
+    if available < min(MIN_OUTPUT_TOKENS, requested_output_tokens):
+        raise TokenBudgetError(
+            f"The request needs about {prompt_tokens} prompt tokens, leaving {max(0, available)} of the "
+            f"model's {window}-token context for output."
+        )
+    return TokenBudget(
+        prompt_tokens=prompt_tokens,
+        requested_output_tokens=requested_output_tokens,
+        max_tokens=min(requested_output_tokens, available),
+        context_window=window,
+    )
@@ -0,0 +1,328 @@
+"""
+Lightweight tracing and metrics
+Each generation gets a Trace with its own trace ID. Code along the way records timed spans
+(prompt building, cache lookups, queueing, connecting, first token, streaming) with token counts
+and cache status, and every finished span feeds process-wide aggregates. The aggregates can be
+scraped in Prometheus text format (METRICS_PORT) or appended to a JSONL file (METRICS_JSONL_PATH);
+finished traces can be appended to TRACE_JSONL_PATH for offline waterfalls.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hedging import LatencyWindow
+
+logger = logging.getLogger(__name__)
+
+# Serve GET /metrics in Prometheus text format on this port (off when unset)
+METRICS_PORT = os.getenv("METRICS_PORT")
+# Append a metrics snapshot to this JSONL file every METRICS_JSONL_INTERVAL seconds (off when unset)
+METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH")
+METRICS_JSONL_INTERVAL = float(os.getenv("METRICS_JSONL_INTERVAL", "60"))
+# Append every finished trace, with its spans, to this JSONL file (off when unset)
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH")
+METRIC_PREFIX = "ga_project_generator"
+
+
+class Span:
+    """A timed step of a trace; attrs hold details such as model, tokens or cache status"""
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.error = None
+        self.start = time.monotonic()
+        self.end = None
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.monotonic()) - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def fail(self, error):
+        self.error = str(error)
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.monotonic()
+            get_metrics().record_span(self)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - self.trace.start) * 1000, 1),
+            "duration_ms": round(self.duration * 1000, 1),
+            "error": self.error,
+            "attrs": dict(self.attrs),
+        }
+
+
+class _NoSpan:
+    """Stands in for a Span when nothing is being traced"""
+
+    def set(self, **attrs):
+        pass
+
+    def fail(self, error):
+        pass
+
+    def finish(self):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class Trace:
+    """The spans recorded for one generation; safe to add spans from several threads"""
+
+    def __init__(self, name, trace_id=None, **attrs):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.start = time.monotonic()
+        self.end = None
+        self._lock = threading.Lock()
+        self._spans = []
+
+    def start_span(self, name, **attrs):
+        """Start a span; call finish() on it when the step is done"""
+        span = Span(self, name, attrs)
+        with self._lock:
+            self._spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time the enclosed block as a span; exceptions (including a closed generator) mark it failed"""
+        span = self.start_span(name, **attrs)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(type(e).__name__ if isinstance(e, GeneratorExit) else e)
+            raise
+        finally:
+            span.finish()
+
+    def finish(self):
+        """Close the trace and append it to TRACE_JSONL_PATH when set"""
+        if self.end is not None:
+            return
+        self.end = time.monotonic()
+        if TRACE_JSONL_PATH:
+            _append_jsonl(TRACE_JSONL_PATH, dict(self.to_dict(), type="trace"))
+
+    def spans(self):
+        """Span dicts ordered by start time"""
+        with self._lock:
+            spans = list(self._spans)
+        return [span.to_dict() for span in sorted(spans, key=lambda span: span.start)]
+
+    def to_dict(self):
+        end = self.end if self.end is not None else time.monotonic()
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attrs": dict(self.attrs),
+            "started_at": self.started_at,
+            "duration_ms": round((end - self.start) * 1000, 1),
+            "spans": self.spans(),
+        }
+
+
+@contextmanager
+def span(trace, name, **attrs):
+    """trace.span(...), or a no-op when trace is None"""
+    if trace is None:
+        yield NO_SPAN
+    else:
+        with trace.span(name, **attrs) as active:
+            yield active
+
+
+def start_span(trace, name, **attrs):
+    """trace.start_span(...), or a no-op span when trace is None"""
+    return NO_SPAN if trace is None else trace.start_span(name, **attrs)
+
+
+class Metrics:
+    """
+    Process-wide aggregates over finished spans: count, errors and latency percentiles per span
+    name, token totals, streaming throughput and section cache hits
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = {}
+        self._tokens = {"prompt": 0, "completion": 0}
+        self._stream = {"tokens": 0, "seconds": 0.0}
+        self._cache = {}
+
+    def record_timing(self, name, seconds, error=False):
+        """Record a timing that is not part of a trace (e.g. rendering a page)"""
+        with self._lock:
+            self._record(name, seconds, error)
+
+    def _record(self, name, seconds, error):
+        """Call with the lock held"""
+        stats = self._spans.get(name)
+        if stats is None:
+            stats = self._spans[name] = {"count": 0, "errors": 0, "seconds": 0.0, "window": LatencyWindow()}
+        stats["count"] += 1
+        stats["errors"] += bool(error)
+        stats["seconds"] += seconds
+        stats["window"].record(seconds)
+
+    def record_span(self, span):
+        with self._lock:
+            self._record(span.name, span.duration, span.error is not None)
+            self._tokens["prompt"] += span.attrs.get("prompt_tokens") or 0
+            self._tokens["completion"] += span.attrs.get("completion_tokens") or 0
+            if span.name == "stream" and span.attrs.get("completion_tokens"):
+                self._stream["tokens"] += span.attrs["completion_tokens"]
+                self._stream["seconds"] += span.duration
+            if "cache" in span.attrs:
+                self._cache[span.attrs["cache"]] = self._cache.get(span.attrs["cache"], 0) + 1
+
+    def snapshot(self):
+        """Aggregates as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "spans": {
+                    name: {
+                        "count": stats["count"],
+                        "errors": stats["errors"],
+                        "error_rate": stats["errors"] / stats["count"],
+                        "seconds": stats["seconds"],
+                        "p50": stats["window"].percentile(0.5),
+                        "p95": stats["window"].percentile(0.95),
+                        "p99": stats["window"].percentile(0.99),
+                    }
+                    for name, stats in self._spans.items()
+                },
+                "tokens": dict(self._tokens),
+                "tokens_per_second": self._stream["tokens"] / self._stream["seconds"] if self._stream["seconds"] else 0.0,
+                "cache": dict(self._cache),
+            }
+
+    def prometheus(self):
+        """Aggregates in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {METRIC_PREFIX}_span_seconds summary"]
+        for name, stats in snapshot["spans"].items():
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append(f'{METRIC_PREFIX}_span_seconds{{span="{name}",quantile="{quantile}"}} {stats[key]:.6f}')
+            lines.append(f'{METRIC_PREFIX}_span_seconds_sum{{span="{name}"}} {stats["seconds"]:.6f}')
+            lines.append(f'{METRIC_PREFIX}_span_seconds_count{{span="{name}"}} {stats["count"]}')
+        lines.append(f"# TYPE {METRIC_PREFIX}_span_errors_total counter")
+        for name, stats in snapshot["spans"].items():
+            lines.append(f'{METRIC_PREFIX}_span_errors_total{{span="{name}"}} {stats["errors"]}')
+        lines.append(f"# TYPE {METRIC_PREFIX}_tokens_total counter")
+        for kind, tokens in snapshot["tokens"].items():
+            lines.append(f'{METRIC_PREFIX}_tokens_total{{type="{kind}"}} {tokens}')
+        lines.append(f"# TYPE {METRIC_PREFIX}_completion_tokens_per_second gauge")
+        lines.append(f"{METRIC_PREFIX}_completion_tokens_per_second {snapshot['tokens_per_second']:.3f}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_section_cache_total counter")
+        for status, count in snapshot["cache"].items():
+            lines.append(f'{METRIC_PREFIX}_section_cache_total{{status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def format_waterfall(trace, width=48):
+    """Render a trace dict (Trace.to_dict()) as a fixed-width text waterfall, one line per span"""
+    spans = trace["spans"]
+    total = max([trace["duration_ms"]] + [s["start_ms"] + s["duration_ms"] for s in spans]) or 1.0
+    lines = [f"trace {trace['trace_id']}  {trace['duration_ms']:.0f} ms"]
+    for s in spans:
+        detail = s["attrs"].get("section") or s["attrs"].get("model", "").split("/")[-1]
+        label = f"{s['name']} {detail}".strip()[:36]
+        offset = min(width - 1, int(s["start_ms"] / total * width))
+        length = max(1, min(width - offset, round(s["duration_ms"] / total * width)))
+        bar = (" " * offset + "█" * length).ljust(width)
+        lines.append(f"{label:<36} |{bar}| {s['duration_ms']:>8.0f} ms" + ("  ✗" if s["error"] else ""))
+    return "\n".join(lines)
+
+
+_append_lock = threading.Lock()
+
+
+def _append_jsonl(path, record):
+    """Append one record as a JSON line; export failures never break a generation"""
+    try:
+        with _append_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_exporters():
+    """
+    Start the exporters configured by METRICS_PORT and METRICS_JSONL_PATH on daemon threads.
+    Returns the metrics HTTP server, or None when it is not enabled or its port is taken (e.g.
+    by another worker process, or by the app while the bulk CLI runs); the other exporters
+    still start.
+    """
+    server = None
+    if METRICS_PORT:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", int(METRICS_PORT)), _MetricsHandler)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on port %s: %s", METRICS_PORT, e)
+        else:
+            threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    if METRICS_JSONL_PATH:
+        def export():
+            while True:
+                time.sleep(METRICS_JSONL_INTERVAL)
+                export_metrics_jsonl()
+
+        threading.Thread(target=export, daemon=True, name="metrics-jsonl").start()
+    return server
+
+
+def export_metrics_jsonl(path=None):
+    """Append the current aggregates to path (METRICS_JSONL_PATH by default)"""
+    path = path or METRICS_JSONL_PATH
+    if path:
+        _append_jsonl(path, dict(get_metrics().snapshot(), type="metrics"))
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide Metrics"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics